@@ -0,0 +1,121 @@
+"""
+Reservation interval helpers and the DynamoDB access layer for availability checks.
+
+The interval functions are pure Python so they can be exercised against any
+object exposing a boto3-style ``Table.query`` (including the local stand-in in
+``local_stubs.py``).
+"""
+
+from datetime import date, datetime, timedelta
+
+# GSI on hauliday_reservations: hash key equipment_id, range key start_date
+EQUIPMENT_DATE_INDEX = 'EquipmentDateIndex'
+
+
+def parse_date(value):
+    """Parse an ISO date or datetime string into a ``date``"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).strip()).date()
+
+
+def overlaps(start_a, end_a, start_b, end_b):
+    """Return True if the inclusive day ranges [start_a, end_a] and [start_b, end_b] overlap"""
+    return start_a <= end_b and end_a >= start_b
+
+
+def to_interval(item):
+    """Convert a reservation item into a (start, end, reservation_id) tuple"""
+    return (parse_date(item['start_date']), parse_date(item['end_date']), item.get('reservation_id'))
+
+
+def find_conflict(intervals, start, end):
+    """Return the first interval overlapping [start, end], or None if the range is free"""
+    for interval in intervals:
+        if overlaps(interval[0], interval[1], start, end):
+            return interval
+    return None
+
+
+def query_reservations(table, equipment_id, start=None, end=None, index_name=EQUIPMENT_DATE_INDEX):
+    """
+    Query active reservations for one piece of equipment, following LastEvaluatedKey.
+
+    ``start_date <= end`` is applied as the key condition on the index sort key so
+    DynamoDB only reads reservations that begin before the requested window
+    closes; ``end_date >= start`` and the cancelled status are filtered server side.
+    """
+    key_condition = 'equipment_id = :equipmentId'
+    filter_expression = '#status <> :cancelled'
+    values = {
+        ':equipmentId': equipment_id,
+        ':cancelled': 'cancelled'
+    }
+
+    if end is not None:
+        # start_date may carry a time component, so bound by the following day
+        key_condition += ' AND start_date < :endExclusive'
+        values[':endExclusive'] = (parse_date(end) + timedelta(days=1)).isoformat()
+
+    if start is not None:
+        filter_expression += ' AND end_date >= :start'
+        values[':start'] = parse_date(start).isoformat()
+
+    query_kwargs = {
+        'IndexName': index_name,
+        'KeyConditionExpression': key_condition,
+        'FilterExpression': filter_expression,
+        'ExpressionAttributeValues': values,
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+
+    items = []
+    while True:
+        response = table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            return items
+        query_kwargs['ExclusiveStartKey'] = last_key
+
+
+def load_intervals(items, on_error=None):
+    """Convert reservation items to intervals, skipping items with unparseable dates"""
+    intervals = []
+    for item in items:
+        try:
+            intervals.append(to_interval(item))
+        except (KeyError, TypeError, ValueError) as error:
+            if on_error:
+                on_error(item, error)
+    return intervals
+
+
+def free_ranges(intervals, start, end):
+    """Return the (first, last) day ranges within [start, end] that no interval overlaps, in order"""
+    ranges = []
+    cursor = start
+    for interval_start, interval_end, *_ in sorted(intervals, key=lambda interval: interval[:2]):
+        if interval_end < cursor:
+            continue
+        if interval_start > end:
+            break
+        if interval_start > cursor:
+            ranges.append((cursor, interval_start - timedelta(days=1)))
+        cursor = interval_end + timedelta(days=1)
+    if cursor <= end:
+        ranges.append((cursor, end))
+    return ranges
+
+
+def day_ranges(days):
+    """Collapse sorted dates into (first, last) runs of consecutive days"""
+    ranges = []
+    for day in days:
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
@@ -0,0 +1,90 @@
+"""
+Lazily constructed, shared boto3 clients tuned for voice latency.
+
+boto3 is imported and clients are built on first use rather than at import
+time, so turns answered locally (fast path, caches) never pay for them. Each
+client is created once per container and reused across warm invocations.
+"""
+
+import os
+import threading
+import time
+
+from cold_start import profiler
+
+BEDROCK_CONNECT_TIMEOUT = float(os.environ.get('BEDROCK_CONNECT_TIMEOUT', '2'))
+BEDROCK_READ_TIMEOUT = float(os.environ.get('BEDROCK_READ_TIMEOUT', '20'))
+BEDROCK_MAX_ATTEMPTS = int(os.environ.get('BEDROCK_MAX_ATTEMPTS', '2'))
+DYNAMODB_CONNECT_TIMEOUT = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '1'))
+DYNAMODB_READ_TIMEOUT = float(os.environ.get('DYNAMODB_READ_TIMEOUT', '2'))
+DYNAMODB_MAX_ATTEMPTS = int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '3'))
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _config(connect_timeout, read_timeout, max_attempts, max_pool_connections):
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={'mode': 'adaptive', 'max_attempts': max_attempts},
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=True
+    )
+
+
+def _build_bedrock_runtime():
+    import boto3
+
+    # Few retries: on a phone call a fast failure beats a long silent retry loop
+    return boto3.client('bedrock-runtime', config=_config(
+        BEDROCK_CONNECT_TIMEOUT, BEDROCK_READ_TIMEOUT, BEDROCK_MAX_ATTEMPTS, max_pool_connections=10
+    ))
+
+
+def _build_dynamodb():
+    import boto3
+
+    # Pool sized for the concurrent per-equipment availability lookups
+    return boto3.resource('dynamodb', config=_config(
+        DYNAMODB_CONNECT_TIMEOUT, DYNAMODB_READ_TIMEOUT, DYNAMODB_MAX_ATTEMPTS, max_pool_connections=25
+    ))
+
+
+_BUILDERS = {
+    'bedrock-runtime': _build_bedrock_runtime,
+    'dynamodb': _build_dynamodb,
+}
+
+
+def get_client(name):
+    """Return the shared client for name, constructing it on first use"""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                started_at = time.perf_counter()
+                client = _BUILDERS[name]()
+                profiler.record(f'client:{name}', time.perf_counter() - started_at)
+                _clients[name] = client
+    return client
+
+
+def get_bedrock_runtime():
+    return get_client('bedrock-runtime')
+
+
+def get_dynamodb():
+    return get_client('dynamodb')
+
+
+def set_client(name, client):
+    """Install a client (e.g. a local stand-in); None drops it so the next call rebuilds it"""
+    with _lock:
+        if client is None:
+            _clients.pop(name, None)
+        else:
+            _clients[name] = client
@@ -0,0 +1,308 @@
+"""
+Deadlines, hedged requests and a circuit breaker for Bedrock calls on voice turns.
+
+Each turn gets a deadline: the Lambda's remaining time minus a reserve for
+building the response, capped by a per-turn budget short enough that the
+caller is not left in silence. A call still running after the recent p95
+latency gets one hedged duplicate, and the first reply wins. Calls that time
+out, are throttled or fail with a server-side (5xx) error count towards a
+per-model circuit breaker; while it is open, calls fail immediately so the
+handler can answer without the model. Other errors, such as a
+ValidationException from a bad payload, are raised without tripping the
+breaker, since they say nothing about the model's health.
+
+Once a reply wins or the deadline passes, the other calls are given up: a
+call still queued for a worker is cancelled and never sent, and a running
+call's cancel event is set so a streamed reply stops reading and closes its
+body. A running call that cannot be interrupted (threads cannot be) still
+completes, bounded by the Bedrock client's read timeout, and its reply is
+handed to on_discard so the tokens it used are still counted.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, wait
+
+try:
+    from botocore.exceptions import ConnectionError as EndpointError, HTTPClientError
+    _TRANSPORT_ERRORS = (TimeoutError, ConnectionError, EndpointError, HTTPClientError)
+except ImportError:  # botocore ships with the Lambda runtime; bare local runs may lack it
+    _TRANSPORT_ERRORS = (TimeoutError, ConnectionError)
+
+# Error codes (compared case-insensitively; stream errors use camelCase) that mean the model is
+# overloaded or unhealthy rather than that the request was wrong
+TRANSIENT_ERROR_CODES = frozenset(code.lower() for code in (
+    'ThrottlingException', 'TooManyRequestsException', 'ServiceUnavailableException',
+    'InternalServerException', 'ModelNotReadyException', 'ModelTimeoutException',
+    'ModelStreamErrorException', 'RequestTimeout', 'RequestTimeoutException',
+))
+
+
+class ModelUnavailable(Exception):
+    """Raised when a model call cannot be answered for this turn"""
+
+
+class ModelCallTimeout(ModelUnavailable):
+    """Raised when no reply arrived before the turn deadline"""
+
+
+class CircuitOpen(ModelUnavailable):
+    """Raised without calling the model while its circuit breaker is open"""
+
+
+def is_transient(error):
+    """True for timeouts, throttling, 5xx responses and connection failures"""
+    if isinstance(error, (ModelCallTimeout,) + _TRANSPORT_ERRORS):
+        return True
+    response = getattr(error, 'response', None) or {}
+    code = response.get('Error', {}).get('Code', '')
+    status = response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+    return code.lower() in TRANSIENT_ERROR_CODES or status == 429 or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and stays open for reset_seconds.
+
+    After that one trial call is let through (half-open); its outcome closes
+    the circuit again or reopens it for another reset_seconds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, reset_seconds=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """Return True if a call may go ahead now"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+    def record_ignored(self):
+        """A call ended with an error that says nothing about the model; only free the trial slot"""
+        with self._lock:
+            self._trial_running = False
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies, in seconds"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Return the given percentile, or None until min_samples latencies have been seen"""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if len(ordered) < self.min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class BedrockGuard:
+    """Runs model calls under the current turn's deadline, with hedging and per-model circuit breakers"""
+
+    def __init__(self, executor, turn_budget_ms=8000, reserve_ms=1000, hedge_enabled=True,
+                 hedge_after_ms=2500, hedge_min_ms=500, failure_threshold=3, reset_seconds=30.0,
+                 clock=time.monotonic):
+        self.executor = executor
+        self.turn_budget_ms = turn_budget_ms
+        self.reserve_ms = reserve_ms
+        self.hedge_enabled = hedge_enabled
+        self.hedge_after_ms = hedge_after_ms
+        self.hedge_min_ms = hedge_min_ms
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.latency = LatencyTracker()
+        self.breakers = {}
+        self.deadline = None
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.short_circuits = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def start_turn(self, context=None):
+        """Set the deadline for this turn from the Lambda context's remaining time and the turn budget"""
+        budget_ms = self.turn_budget_ms
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            budget_ms = min(budget_ms, context.get_remaining_time_in_millis() - self.reserve_ms)
+        self.deadline = self.clock() + max(budget_ms, 0) / 1000
+
+    def remaining(self):
+        """Seconds left before the turn deadline (the full budget if no turn was started)"""
+        if self.deadline is None:
+            return self.turn_budget_ms / 1000
+        return self.deadline - self.clock()
+
+    def hedge_delay(self):
+        """Seconds to wait before sending a hedged duplicate: the recent p95, or the default until known"""
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return self.hedge_after_ms / 1000
+        return max(p95, self.hedge_min_ms / 1000)
+
+    def breaker(self, model_id):
+        with self._lock:
+            if model_id not in self.breakers:
+                self.breakers[model_id] = CircuitBreaker(self.failure_threshold, self.reset_seconds, self.clock)
+            return self.breakers[model_id]
+
+    def call(self, model_id, request, on_discard=None):
+        """
+        Run request(cancelled) for model_id within the turn deadline and return the first successful reply.
+
+        cancelled is a threading.Event set once that call's reply is no longer
+        wanted. on_discard(reply) is called with every reply that completed but
+        was not returned, possibly after this method has returned.
+        """
+        started_at = self.clock()
+        deadline = started_at + self.remaining()
+        if deadline <= started_at:
+            # Earlier steps used up the turn; that is not the model's failure
+            raise ModelCallTimeout('turn deadline already passed')
+
+        breaker = self.breaker(model_id)
+        if not breaker.allow():
+            with self._lock:
+                self.short_circuits += 1
+            raise CircuitOpen(f'circuit open for {model_id}')
+
+        try:
+            result = self._first_reply(request, deadline, on_discard)
+        except ModelCallTimeout:
+            with self._lock:
+                self.timeouts += 1
+            self.latency.add(self.clock() - started_at)
+            breaker.record_failure()
+            raise
+        except Exception as error:
+            if is_transient(error):
+                breaker.record_failure()
+            else:
+                breaker.record_ignored()
+            raise
+        self.latency.add(self.clock() - started_at)
+        breaker.record_success()
+        return result
+
+    def _first_reply(self, request, deadline, on_discard):
+        attempts = {}
+        settled = threading.Event()
+
+        def attempt(cancelled):
+            # A worker can pick up a queued duplicate before the winner is seen here, so check first
+            if settled.is_set():
+                with self._lock:
+                    self.cancelled += 1
+                raise CancelledError()
+            reply = request(cancelled)
+            settled.set()
+            return reply
+
+        def submit():
+            cancelled = threading.Event()
+            future = self.executor.submit(attempt, cancelled)
+            attempts[future] = cancelled
+            return future
+
+        primary = submit()
+        pending = {primary}
+        hedge_at = self.clock() + self.hedge_delay()
+        hedged = not self.hedge_enabled or hedge_at >= deadline
+        error = None
+        winner = None
+
+        try:
+            while pending:
+                wait_until = deadline if hedged else hedge_at
+                done, pending = wait(pending, timeout=max(wait_until - self.clock(), 0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        winner = future
+                        if future is not primary:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return future.result()
+                    error = future.exception()
+                if not done and not hedged:
+                    # The primary call is slower than usual; race a duplicate against it
+                    hedged = True
+                    with self._lock:
+                        self.hedges += 1
+                    pending.add(submit())
+                elif not done:
+                    raise ModelCallTimeout('no reply within the turn deadline')
+            raise error
+        finally:
+            settled.set()
+            self._give_up(attempts, winner, on_discard)
+
+    def _give_up(self, attempts, winner, on_discard):
+        """Cancel every call except winner; replies from calls that still complete go to on_discard"""
+        for future, cancelled in attempts.items():
+            if future is winner:
+                continue
+            cancelled.set()
+            if future.cancel():
+                with self._lock:
+                    self.cancelled += 1
+            elif on_discard is not None:
+                future.add_done_callback(lambda done: not done.cancelled() and done.exception() is None
+                                         and on_discard(done.result()))
+
+    def stats(self):
+        """Return hedging, timeout and circuit breaker counters"""
+        return {
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'timeouts': self.timeouts,
+            'short_circuits': self.short_circuits,
+            'cancelled': self.cancelled,
+            'open_circuits': sorted(model_id for model_id, breaker in self.breakers.items()
+                                    if breaker.state != CircuitBreaker.CLOSED),
+        }
@@ -0,0 +1,110 @@
+"""
+Helpers for reading Anthropic Messages responses from invoke_model_with_response_stream.
+"""
+
+import json
+import re
+import time
+
+from conversation_history import estimate_tokens
+
+# A directive is complete once every argument has arrived; the trailing
+# whitespace on CREATE_RESERVATION marks the end of the optional phone field.
+_DIRECTIVE = (
+    r'CHECK_AVAILABILITY_ANY:\s*\d{4}-\d{2}-\d{2},\s*\d{4}-\d{2}-\d{2}'
+    r'|CHECK_AVAILABILITY:[\w-]+,\s*\d{4}-\d{2}-\d{2},\s*\d{4}-\d{2}-\d{2}'
+    r'|FREE_DATES:[\w+-]+,\s*\d{4}-\d{2}-\d{2},\s*\d{4}-\d{2}-\d{2}'
+    r'|CREATE_RESERVATION:(?:[^,\n]+,){5}[^\s,]*\s'
+)
+DIRECTIVE_PATTERN = re.compile(_DIRECTIVE)
+
+# The model may list several directives, one per line; stop once a complete
+# directive is followed by text that cannot start another one
+DIRECTIVE_BATCH_PATTERN = re.compile(rf'(?:{_DIRECTIVE})\s*(?=[^\sCF]|C[^HR]|F[^R])')
+
+# Longest directive we expect, used to rescan only the tail of the text
+_MAX_DIRECTIVE_LENGTH = 300
+
+
+def iter_stream_events(body):
+    """Yield decoded Messages API events from a Bedrock response stream body"""
+    for event in body:
+        chunk = event.get('chunk')
+        if chunk:
+            yield json.loads(chunk['bytes'])
+
+
+def read_stream(response, stop_pattern=None, started_at=None, clock=time.perf_counter, cancelled=None):
+    """
+    Assemble a streamed Messages response, stopping as soon as stop_pattern matches the text.
+
+    Returns a dict with the assembled content blocks (text and tool_use), the
+    concatenated text, the stop reason, usage, whether generation was cut
+    short, and time-to-first-token / total latency in milliseconds measured
+    from started_at. Reading also stops, closing the body, once the optional
+    cancelled event is set (the reply lost a hedge race or the turn gave up on
+    it). A stream cut short never sees the message_delta event carrying
+    output_tokens, so that count is estimated from the streamed text.
+    """
+    started_at = clock() if started_at is None else started_at
+    body = response['body']
+    text = ''
+    blocks = {}
+    tool_inputs = {}
+    first_token_at = None
+    stopped_early = False
+    abandoned = False
+    stop_reason = None
+    usage = {}
+
+    for event in iter_stream_events(body):
+        if cancelled is not None and cancelled.is_set():
+            abandoned = True
+            break
+        event_type = event.get('type')
+
+        if event_type == 'message_start':
+            usage.update(event.get('message', {}).get('usage', {}))
+        elif event_type == 'message_delta':
+            usage.update(event.get('usage', {}))
+            stop_reason = event.get('delta', {}).get('stop_reason', stop_reason)
+        elif event_type == 'content_block_start':
+            blocks[event['index']] = dict(event['content_block'])
+            if first_token_at is None:
+                first_token_at = clock()
+        elif event_type == 'content_block_delta':
+            delta = event['delta']
+            if first_token_at is None:
+                first_token_at = clock()
+
+            if delta.get('type') == 'input_json_delta':
+                tool_inputs[event['index']] = tool_inputs.get(event['index'], '') + delta.get('partial_json', '')
+            elif delta.get('type') == 'text_delta':
+                block = blocks.setdefault(event['index'], {'type': 'text', 'text': ''})
+                block['text'] = block.get('text', '') + delta['text']
+                scan_from = max(0, len(text) - _MAX_DIRECTIVE_LENGTH)
+                text += delta['text']
+
+                if stop_pattern and stop_pattern.search(text, scan_from):
+                    stopped_early = True
+                    break
+        elif event_type == 'content_block_stop' and event['index'] in tool_inputs:
+            raw_input = tool_inputs.pop(event['index'])
+            blocks[event['index']]['input'] = json.loads(raw_input) if raw_input else {}
+
+    if (stopped_early or abandoned) and hasattr(body, 'close'):
+        # Closing the stream ends generation instead of paying for the rest of the reply
+        body.close()
+    if (stopped_early or abandoned) and 'output_tokens' not in usage:
+        usage['output_tokens'] = estimate_tokens(text)
+
+    finished_at = clock()
+    return {
+        'content': [blocks[index] for index in sorted(blocks)],
+        'text': text,
+        'stop_reason': 'stop_sequence' if stopped_early else stop_reason,
+        'stopped_early': stopped_early,
+        'usage': usage,
+        'time_to_first_token_ms': round((first_token_at - started_at) * 1000, 1) if first_token_at else None,
+        'total_latency_ms': round((finished_at - started_at) * 1000, 1)
+    }
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold- vs. warm-start benchmark for the rental Lambda.
+
+Each run starts a fresh interpreter (a cold container) with
+COLD_START_PROFILE=true, imports lambda_function, builds the real boto3
+clients (no network calls are made), swaps in the local stand-ins and then
+invokes lambda_handler once cold and repeatedly warm.
+
+Run with: python benchmarks/bench_cold_start.py [--runs N] [--warm-invocations N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CALL_CENTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, CALL_CENTER_DIR)
+
+EVENT = {
+    'inputTranscript': 'Do you deliver the castle bounce house?',
+    'sessionState': {'sessionAttributes': {}, 'intent': {'name': 'FallbackIntent'}},
+}
+
+
+def child(warm_invocations):
+    """Measure one cold start in this (fresh) interpreter and print the phases as JSON"""
+    started_at = time.perf_counter()
+    import lambda_function
+    import_ms = (time.perf_counter() - started_at) * 1000
+
+    import aws_clients
+    from local_stubs import FakeBedrockRuntime, LocalDynamoDBResource, reservations_table
+
+    aws_clients.get_bedrock_runtime()
+    aws_clients.get_dynamodb()
+    aws_clients.set_client('bedrock-runtime', FakeBedrockRuntime('We deliver within ten miles.'))
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(reservations_table([])))
+
+    lambda_function.lambda_handler(EVENT, None)
+    phases = lambda_function.profiler.report()['cold_start_ms']
+    phases['import_total'] = round(import_ms, 2)
+
+    timings = []
+    for _ in range(warm_invocations):
+        started_at = time.perf_counter()
+        lambda_function.lambda_handler(EVENT, None)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    phases['warm_invocation'] = round(statistics.median(timings), 2)
+    print(json.dumps(phases))
+
+
+def run_cold_start(warm_invocations):
+    env = dict(os.environ, COLD_START_PROFILE='true', RESPONSE_CACHE_ENABLED='false')
+    env.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', '--warm-invocations', str(warm_invocations)],
+        cwd=CALL_CENTER_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warm-invocations', type=int, default=50)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.warm_invocations)
+        return
+
+    runs = [run_cold_start(args.warm_invocations) for _ in range(args.runs)]
+    for phase in runs[0]:
+        values = [run[phase] for run in runs if phase in run]
+        print(f"{phase:<28} median {statistics.median(values):9.2f} ms   max {max(values):9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: precompiled intent matcher vs. the original per-keyword loops.
+
+Run with: python benchmarks/bench_intent_matcher.py [--iterations N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from intent_matcher import GOODBYE_PHRASES, KEYWORD_CATEGORIES, is_goodbye, is_rental_message, match_intents  # noqa: E402
+
+UTTERANCES = [
+    "How much does the cotton candy machine cost?",
+    "Is the tandem kayak available next weekend?",
+    "I'd like to book the water slide bounce house for my daughter's party on August 30th",
+    "Tell me about your company history",
+    "Do you have a trailer I can borrow tomorrow morning for a move across town?",
+    "no thank you",
+    "that's all, goodbye",
+    "um yeah so I was wondering about the paddle board",
+    "Write me a poem about the ocean",
+    "bye",
+]
+
+_LEGACY_KEYWORDS = [keyword for keywords in KEYWORD_CATEGORIES.values() for keyword in keywords]
+
+
+def legacy_validate(message):
+    """The original validate_rental_message implementation"""
+    if not message or len(message.strip()) == 0:
+        return False
+    message_lower = message.lower()
+    return any(keyword in message_lower for keyword in _LEGACY_KEYWORDS)
+
+
+def legacy_should_end(user_query):
+    """The original end-of-call loop from lambda_handler"""
+    user_query_lower = user_query.lower().strip()
+    for phrase in GOODBYE_PHRASES:
+        if (user_query_lower == phrase or
+            user_query_lower.startswith(phrase + ' ') or
+            user_query_lower.endswith(' ' + phrase) or
+            user_query_lower == 'no' or user_query_lower == 'nope'):
+            return True
+    return False
+
+
+def legacy_turn(message):
+    return legacy_validate(message), legacy_should_end(message)
+
+
+def matcher_turn(message):
+    intent = match_intents(message)
+    return bool(intent.keywords), intent.is_goodbye
+
+
+def check_equivalence():
+    for message in UTTERANCES:
+        assert is_rental_message(message) == legacy_validate(message), message
+        assert is_goodbye(message) == legacy_should_end(message), message
+        assert matcher_turn(message) == legacy_turn(message), message
+
+
+def bench(label, function, iterations):
+    elapsed = timeit.timeit(lambda: [function(message) for message in UTTERANCES], number=iterations)
+    per_call_us = elapsed / (iterations * len(UTTERANCES)) * 1e6
+    print(f"{label:<38} {per_call_us:8.2f} us/utterance")
+    return per_call_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    check_equivalence()
+    legacy = bench('legacy validate + end-of-call loop', legacy_turn, args.iterations)
+    bench('legacy validate only', legacy_validate, args.iterations)
+    bench('is_rental_message', is_rental_message, args.iterations)
+    matcher = bench('match_intents (categories + goodbye)', matcher_turn, args.iterations)
+    print(f"\nmatch_intents speedup over legacy turn checks: {legacy / matcher:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
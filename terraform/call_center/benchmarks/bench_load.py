@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Offline load test for lambda_handler with per-stage latency percentiles.
+
+Recorded Lex and Connect events (benchmarks/corpus/*.jsonl) are replayed
+concurrently by worker processes, each standing in for one warm Lambda
+container. Bedrock and DynamoDB are the local stand-ins with latencies
+drawn from configurable distributions, and local_stubs.scripted_model
+answers with tool calls whenever an utterance names equipment and dates.
+
+Per-stage latencies come from the handler's own EMF spans (validation,
+model call, tool execution, DynamoDB read, response build, turn total).
+Token and cost metrics from the same documents (metrics.UNITS) are reported
+separately as totals per request.
+Allocations are measured in a separate tracemalloc pass so tracing does not
+skew the latency numbers. Results are compared with benchmarks/baseline_load.json
+and the run exits non-zero on a regression.
+
+Latency specs are fixed:MS, uniform:LOW_MS,HIGH_MS or lognormal:MEDIAN_MS,SIGMA.
+
+Run with: python benchmarks/bench_load.py [--workers N] [--repeat N] [--update-baseline]
+"""
+
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CALL_CENTER_DIR = os.path.join(BENCHMARKS_DIR, '..')
+sys.path.insert(0, CALL_CENTER_DIR)
+
+CORPUS_GLOB = os.path.join(BENCHMARKS_DIR, 'corpus', '*.jsonl')
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline_load.json')
+
+# Absolute slack on top of the ratio: sub-millisecond stages see this much scheduler jitter at p99
+ABSOLUTE_SLACK_MS = 10.0
+
+
+def latency_sampler(spec, rng):
+    """Return a callable producing latencies in seconds for a distribution spec"""
+    kind, _, arguments = spec.partition(':')
+    values = [float(value) for value in arguments.split(',')] if arguments else []
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: rng.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        return lambda: rng.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f'Unknown latency distribution: {spec}')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def load_corpus():
+    events = []
+    for path in sorted(glob.glob(CORPUS_GLOB)):
+        with open(path) as corpus:
+            events.extend(json.loads(line) for line in corpus if line.strip())
+    return events
+
+
+def shard_events(events, workers, repeat):
+    """
+    Split events across workers, repeated `repeat` times.
+
+    A Connect contact's turns stay on one worker and in order, so its session
+    history builds up the way it does on a real call; each repetition uses a
+    fresh ContactId.
+    """
+    shards = [[] for _ in range(workers)]
+    for round_number in range(repeat):
+        for position, event in enumerate(events):
+            contact_id = event.get('Details', {}).get('ContactData', {}).get('ContactId')
+            if contact_id:
+                event = json.loads(json.dumps(event))
+                event['Details']['ContactData']['ContactId'] = f'{contact_id}-{round_number}'
+                worker = sum(map(ord, contact_id)) % workers
+            else:
+                worker = (round_number * len(events) + position) % workers
+            shards[worker].append(event)
+    return shards
+
+
+def replay(events, config):
+    """Worker process: replay events through lambda_handler and return per-stage timings"""
+    os.environ.update(config['environment'])
+    rng = random.Random(config['seed'])
+
+    import aws_clients
+    import lambda_function
+    from local_stubs import (FakeBedrockRuntime, LocalDynamoDBResource, reservations_table, scripted_model,
+                             sessions_table)
+
+    today = datetime.utcnow().date()
+    reservations = reservations_table([
+        {'reservation_id': f'bench-{offset}', 'equipment_id': equipment_id, 'status': 'confirmed',
+         'start_date': (today + timedelta(days=offset)).isoformat(),
+         'end_date': (today + timedelta(days=offset + 2)).isoformat()}
+        for offset, equipment_id in ((5, 'castle-bounce'), (9, 'tandem-kayak'), (12, 'paddleboard'))
+    ], latency=latency_sampler(config['dynamodb_latency'], rng))
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(reservations, sessions_table()))
+    bedrock = FakeBedrockRuntime(scripted_model(lambda_function.EQUIPMENT_CATALOG, today),
+                                 latency=latency_sampler(config['bedrock_latency'], rng))
+    aws_clients.set_client('bedrock-runtime', bedrock)
+
+    from metrics import UNITS
+
+    documents = []
+    lambda_function.metrics.emit = documents.append
+    stages = {}
+    usage = {}
+    peaks_kib = []
+    errors = 0
+    error_messages = (lambda_function.BEDROCK_ERROR_MESSAGE, lambda_function.MODEL_UNAVAILABLE_MESSAGE,
+                      lambda_function.MODEL_UNAVAILABLE_TEXT)
+
+    if config['trace_allocations']:
+        tracemalloc.start()
+    started_at = time.perf_counter()
+    for event in events:
+        if config['trace_allocations']:
+            tracemalloc.reset_peak()
+            baseline_bytes = tracemalloc.get_traced_memory()[0]
+        response = lambda_function.lambda_handler(event, None)
+        if config['trace_allocations']:
+            peaks_kib.append((tracemalloc.get_traced_memory()[1] - baseline_bytes) / 1024)
+
+        text = response.get('response_text') or response.get('messages', [{}])[0].get('content', '')
+        errors += any(message in text for message in error_messages)
+        for document in documents:
+            if 'Tool' in document:
+                continue
+            for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']:
+                values = document[metric['Name']]
+                if metric['Name'] in UNITS:
+                    usage[metric['Name']] = usage.get(metric['Name'], 0) + sum(values)
+                else:
+                    stages.setdefault(metric['Name'], []).extend(values)
+        documents.clear()
+        bedrock.requests.clear()
+    elapsed = time.perf_counter() - started_at
+    if config['trace_allocations']:
+        tracemalloc.stop()
+    return {'requests': len(events), 'elapsed': elapsed, 'stages': stages, 'usage': usage, 'peaks_kib': peaks_kib,
+            'errors': errors}
+
+
+def run_workers(shards, configs):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        return list(executor.map(replay, shards, configs))
+
+
+def summarize(results, allocation_result):
+    stages = {}
+    usage = {}
+    for result in results:
+        for stage, values in result['stages'].items():
+            stages.setdefault(stage, []).extend(values)
+        for name, total in result['usage'].items():
+            usage[name] = usage.get(name, 0) + total
+    requests = sum(result['requests'] for result in results)
+    peaks = allocation_result['peaks_kib']
+    return {
+        'requests': requests,
+        'errors': sum(result['errors'] for result in results),
+        # Each worker's rate over its own replay, so process start-up and imports are not counted
+        'throughput_rps': round(sum(result['requests'] / result['elapsed'] for result in results), 2),
+        'stages_ms': {stage: {'p50': round(percentile(values, 0.50), 2),
+                              'p95': round(percentile(values, 0.95), 2),
+                              'p99': round(percentile(values, 0.99), 2),
+                              'samples': len(values)}
+                      for stage, values in sorted(stages.items())},
+        'usage_per_request': {name: round(total / requests, 6 if name == 'ModelCostUSD' else 1)
+                              for name, total in sorted(usage.items())},
+        'allocations_kib': {'peak_p50': round(statistics.median(peaks), 1),
+                            'peak_p95': round(percentile(peaks, 0.95), 1)},
+    }
+
+
+def regressions(summary, baseline, tolerance):
+    """Return a description of every metric that is worse than the baseline by more than tolerance"""
+    found = []
+    for stage, expected in baseline.get('stages_ms', {}).items():
+        actual = summary['stages_ms'].get(stage)
+        if actual is None:
+            continue
+        for statistic in ('p95', 'p99'):
+            limit = expected[statistic] * (1 + tolerance) + ABSOLUTE_SLACK_MS
+            if actual[statistic] > limit:
+                found.append(f'{stage} {statistic} {actual[statistic]} ms > {limit:.2f} ms')
+    if 'throughput_rps' in baseline and summary['throughput_rps'] < baseline['throughput_rps'] * (1 - tolerance):
+        found.append(f"throughput {summary['throughput_rps']} rps < {baseline['throughput_rps'] * (1 - tolerance):.2f} rps")
+    expected_peak = baseline.get('allocations_kib', {}).get('peak_p95')
+    if expected_peak and summary['allocations_kib']['peak_p95'] > expected_peak * (1 + tolerance):
+        found.append(f"allocation peak p95 {summary['allocations_kib']['peak_p95']} KiB > "
+                     f"{expected_peak * (1 + tolerance):.1f} KiB")
+    for name, expected in baseline.get('usage_per_request', {}).items():
+        actual = summary['usage_per_request'].get(name, 0)
+        if actual > expected * (1 + tolerance):
+            found.append(f"{name} per request {actual} > {expected * (1 + tolerance):.6g}")
+    if summary['errors'] > baseline.get('errors', 0):
+        found.append(f"{summary['errors']} error replies (baseline {baseline.get('errors', 0)})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='concurrent warm containers')
+    parser.add_argument('--repeat', type=int, default=3, help='times each worker replays its share of the corpus')
+    parser.add_argument('--bedrock-latency', default='lognormal:250,0.4')
+    parser.add_argument('--dynamodb-latency', default='lognormal:8,0.3')
+    parser.add_argument('--tool-mode', default='native', choices=('native', 'directive'))
+    parser.add_argument('--response-cache', action='store_true', help='keep the response cache on (off by default)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown vs. the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    environment = {
+        'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-west-2'),
+        'TOOL_MODE': args.tool_mode,
+        'RESPONSE_CACHE_ENABLED': 'true' if args.response_cache else 'false',
+        'LOG_LEVEL': 'WARNING',
+        'METRICS_ENABLED': 'true',
+        'COLD_START_PROFILE': 'false',
+    }
+
+    def config(seed, trace_allocations=False):
+        return {'environment': environment, 'seed': seed, 'trace_allocations': trace_allocations,
+                'bedrock_latency': args.bedrock_latency, 'dynamodb_latency': args.dynamodb_latency}
+
+    events = load_corpus()
+    shards = shard_events(events, args.workers, args.repeat)
+
+    results = run_workers(shards, [config(args.seed + worker) for worker in range(args.workers)])
+    allocation_result = run_workers([events], [config(args.seed, trace_allocations=True)])[0]
+    summary = summarize(results, allocation_result)
+
+    print(f"{summary['requests']} requests, {args.workers} workers, {summary['throughput_rps']} requests/s, "
+          f"{summary['errors']} error replies")
+    print(f"{'stage':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'samples':>8}")
+    for stage, values in summary['stages_ms'].items():
+        print(f"{stage:<16} {values['p50']:9.2f} {values['p95']:9.2f} {values['p99']:9.2f} {values['samples']:8d}")
+    print('per request: ' + ', '.join(f'{name} {value}' for name, value in summary['usage_per_request'].items()))
+    print(f"allocation peak per request: p50 {summary['allocations_kib']['peak_p50']} KiB, "
+          f"p95 {summary['allocations_kib']['peak_p95']} KiB")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(summary, baseline_file, indent=2)
+            baseline_file.write('\n')
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --update-baseline to create one")
+        return
+    with open(args.baseline) as baseline_file:
+        found = regressions(summary, json.load(baseline_file), args.tolerance)
+    if found:
+        print("\nRegressions against the baseline:")
+        for regression in found:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
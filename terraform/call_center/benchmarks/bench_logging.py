@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-request logging cost and volume, eager f-strings vs. sampled structured logging.
+
+Run with: python benchmarks/bench_logging.py [--iterations N] [--sample-rate R]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import structured_logging  # noqa: E402
+from structured_logging import JsonFormatter, log_fields, start_request  # noqa: E402
+
+EVENT = {
+    'Details': {
+        'ContactData': {
+            'ContactId': 'c0ffee00-1234-5678-9abc-def012345678',
+            'CustomerEndpoint': {'Address': '+15035550142', 'Type': 'TELEPHONE_NUMBER'},
+            'Attributes': {'caller_name': 'Jo', 'debug_logging': 'false'},
+            'SegmentAttributes': {'connect:Subtype': {'ValueString': 'connect:Telephony'}},
+        },
+        'Parameters': {'inputTranscript': 'Is the tandem kayak free on August 30th? Call me at 503-555-0142'},
+    },
+    'Name': 'ContactFlowEvent',
+}
+
+
+def legacy_request(logger):
+    """The original per-request logging: eager json.dumps and pretty-printed Connect parameters"""
+    details = EVENT['Details']
+    logger.info(f"Received event: {json.dumps(EVENT)}")
+    logger.info(f"All Parameters: {json.dumps(details['Parameters'], indent=2)}")
+    logger.info(f"Contact Attributes: {json.dumps(details['ContactData'].get('Attributes', {}), indent=2)}")
+    logger.info(f"Segment Attributes: {json.dumps(details['ContactData'].get('SegmentAttributes', {}), indent=2)}")
+    logger.info(f"Connect user query: {details['Parameters']['inputTranscript']}")
+
+
+def structured_request(logger):
+    details = EVENT['Details']
+    start_request(EVENT, None)
+    logger.debug("Received event", **log_fields(event=EVENT))
+    logger.debug("Connect parameters", **log_fields(
+        parameters=details['Parameters'],
+        attributes=details['ContactData'].get('Attributes', {}),
+        segment_attributes=details['ContactData'].get('SegmentAttributes', {})
+    ))
+    logger.info("Connect user query: %s", details['Parameters']['inputTranscript'])
+
+
+def bench(label, function, formatter, iterations):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger = logging.getLogger()
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+
+    elapsed = timeit.timeit(lambda: function(logger), number=iterations)
+    per_request_us = elapsed / iterations * 1e6
+    bytes_per_request = len(stream.getvalue().encode('utf-8')) / iterations
+    print(f"{label:<28} {per_request_us:8.2f} us/request {bytes_per_request:9.1f} log bytes/request")
+    return per_request_us, bytes_per_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--sample-rate', type=float, default=structured_logging.LOG_SAMPLE_RATE)
+    args = parser.parse_args()
+
+    random.seed(0)
+    structured_logging.LOG_SAMPLE_RATE = args.sample_rate
+    legacy_us, legacy_bytes = bench('legacy eager logging', legacy_request, logging.Formatter('%(message)s'),
+                                    args.iterations)
+    new_us, new_bytes = bench(f'structured (sample {args.sample_rate:g})', structured_request, JsonFormatter(),
+                              args.iterations)
+    print(f"\nCPU speedup: {legacy_us / new_us:.2f}x, log volume reduction: {legacy_bytes / new_bytes:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
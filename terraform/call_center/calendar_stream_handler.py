@@ -0,0 +1,69 @@
+"""
+DynamoDB Streams consumer that keeps hauliday_equipment_calendar in sync.
+
+Each batch of reservation table changes is grouped per equipment item so a
+calendar is read and written once per batch. Invoking the function directly
+with {"action": "rebuild"} recomputes every calendar from a full table scan,
+for backfills or after a stream outage; "equipment_ids" lists items to reset
+even if they no longer have any active reservations.
+
+Each change is tagged with its stream record's sequence number, and a
+calendar skips records it has already applied, so retries are safe. Records
+for items whose update failed are returned as batchItemFailures, and Lambda
+retries from the earliest of them. A batch that still fails after the retries
+goes to the calendar-stream-failures SQS queue. Its reservations are missing
+from the calendar, which then reads those days as free, until the next
+rebuild, so rebuild the affected items whenever that queue is not empty.
+"""
+
+import logging
+import os
+from datetime import datetime
+
+from aws_clients import get_dynamodb
+from reservation_calendar import CalendarChange, apply_deltas, rebuild_calendars, stream_deltas
+from structured_logging import configure_logging, log_fields
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'hauliday_reservations')
+CALENDAR_TABLE_NAME = os.environ.get('CALENDAR_TABLE_NAME', 'hauliday_equipment_calendar')
+
+
+def group_deltas(records):
+    """Collect the changes in a batch of stream records per equipment ID, tagged with their sequence numbers"""
+    changes = {}
+    for record in records:
+        sequence_number = record.get('dynamodb', {}).get('SequenceNumber')
+        for equipment_id, start, end, delta in stream_deltas(record):
+            changes.setdefault(equipment_id, []).append(CalendarChange(start, end, delta, sequence_number))
+    return changes
+
+
+def lambda_handler(event, context):
+    today = datetime.utcnow().date()
+    calendar_table = get_dynamodb().Table(CALENDAR_TABLE_NAME)
+
+    if event.get('action') == 'rebuild':
+        written = rebuild_calendars(get_dynamodb().Table(TABLE_NAME), calendar_table, today,
+                                    event.get('equipment_ids', ()))
+        logger.info("Rebuilt calendars", **log_fields(equipment_ids=written))
+        return {'rebuilt': written}
+
+    records = event.get('Records', [])
+    changes = group_deltas(records)
+    failed = []
+    failed_records = set()
+    for equipment_id, deltas in changes.items():
+        try:
+            apply_deltas(calendar_table, equipment_id, deltas, today)
+        except Exception as error:
+            logger.error("Calendar update failed for %s: %s", equipment_id, error)
+            failed.append(equipment_id)
+            failed_records.update(change.sequence_number for change in deltas)
+    logger.info("Applied reservation changes",
+                **log_fields(records=len(records), equipment_ids=sorted(changes), failed=failed))
+    # Lambda retries from the earliest reported record; calendars skip the records they already applied
+    return {'batchItemFailures': [{'itemIdentifier': sequence_number}
+                                  for sequence_number in sorted(failed_records, key=int)]}
@@ -0,0 +1,51 @@
+"""
+Cold-start instrumentation for the rental Lambda.
+
+With COLD_START_PROFILE=true, the import, client construction and first
+invocation phases are timed and logged as one JSON line after the first
+invocation finishes. When disabled, recording is a no-op.
+"""
+
+import functools
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger()
+
+
+class ColdStartProfiler:
+    """Collects phase durations for the first invocation in a container"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.phases = {}
+        self.reported = False
+
+    def record(self, phase, seconds):
+        if self.enabled and not self.reported:
+            self.phases[phase] = round(seconds * 1000, 2)
+
+    def report(self):
+        """Return the recorded phases in milliseconds"""
+        return {'cold_start_ms': dict(self.phases)}
+
+    def profile_first_call(self, handler):
+        """Decorator timing the first invocation of a Lambda handler and logging the profile"""
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not self.enabled or self.reported:
+                return handler(event, context)
+
+            started_at = time.perf_counter()
+            try:
+                return handler(event, context)
+            finally:
+                self.record('first_invocation', time.perf_counter() - started_at)
+                logger.info(json.dumps(self.report()))
+                self.reported = True
+        return wrapper
+
+
+profiler = ColdStartProfiler(os.environ.get('COLD_START_PROFILE', 'false').lower() == 'true')
@@ -0,0 +1,121 @@
+"""
+Token-budgeted conversation history stored compactly in Lex session attributes.
+
+History is kept as a short running summary of older turns plus the most
+recent user/assistant pairs that fit within a token budget. It is written to
+session attributes either as plain JSON or, when smaller, as zlib-compressed
+base64. Stores that hold binary values use pack_history/unpack_history, which
+skip the base64 step.
+"""
+
+import base64
+import json
+import zlib
+
+HISTORY_ATTRIBUTE = 'conversation_history'
+COMPRESSED_HISTORY_ATTRIBUTE = 'conversation_history_z'
+
+SUMMARY_MAX_CHARS = 600
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for budgeting"""
+    return max(1, len(text) // 4)
+
+
+def load_history(session_attributes):
+    """Return (summary, messages) from session attributes, accepting the legacy JSON list"""
+    if session_attributes.get(COMPRESSED_HISTORY_ATTRIBUTE):
+        raw = zlib.decompress(base64.b64decode(session_attributes[COMPRESSED_HISTORY_ATTRIBUTE]))
+        data = json.loads(raw)
+    else:
+        data = json.loads(session_attributes.get(HISTORY_ATTRIBUTE, '[]') or '[]')
+
+    if isinstance(data, list):
+        return '', data
+    return data.get('summary', ''), data.get('messages', [])
+
+
+def build_model_messages(summary, messages):
+    """Return messages for the model with the running summary folded into the first user turn"""
+    if not summary or not messages:
+        return list(messages)
+    first = messages[0]
+    return [{'role': first['role'], 'content': f"[Earlier in this call: {summary}]\n{first['content']}"}] + list(messages[1:])
+
+
+def _snippet(text):
+    text = ' '.join(text.split())
+    return text if len(text) <= SUMMARY_SNIPPET_CHARS else text[:SUMMARY_SNIPPET_CHARS - 3] + '...'
+
+
+def summarize_turns(summary, dropped):
+    """Fold dropped user/assistant messages into the running summary, keeping the newest facts"""
+    notes = []
+    for message in dropped:
+        speaker = 'Caller' if message['role'] == 'user' else 'You'
+        notes.append(f"{speaker}: {_snippet(message['content'])}")
+    summary = '; '.join(([summary] if summary else []) + notes)
+    if len(summary) > SUMMARY_MAX_CHARS:
+        summary = '...' + summary[-(SUMMARY_MAX_CHARS - 3):]
+    return summary
+
+
+def append_turn(summary, messages, user_message, assistant_message, token_budget):
+    """Add a turn and trim the oldest user/assistant pairs into the summary until within budget"""
+    messages = list(messages) + [
+        {'role': 'user', 'content': user_message},
+        {'role': 'assistant', 'content': assistant_message}
+    ]
+
+    total = sum(estimate_tokens(message['content']) for message in messages) + estimate_tokens(summary or ' ')
+    cut = 0
+    # Always keep the latest pair; drop whole pairs so roles keep alternating from 'user'
+    while total > token_budget and len(messages) - cut > 2:
+        total -= sum(estimate_tokens(message['content']) for message in messages[cut:cut + 2])
+        cut += 2
+
+    if cut:
+        summary = summarize_turns(summary, messages[:cut])
+    return summary, messages[cut:]
+
+
+def encode_history(summary, messages):
+    """
+    Encode history for session attributes, choosing compressed base64 when it is smaller.
+
+    Returns (attributes, stats) where stats compares the stored size with the
+    same data written with default json.dumps, the way history used to be stored.
+    """
+    data = {'summary': summary, 'messages': messages} if summary else messages
+    plain = json.dumps(data, separators=(',', ':'))
+    compressed = base64.b64encode(zlib.compress(plain.encode('utf-8'), 9)).decode('ascii')
+
+    if len(compressed) < len(plain):
+        attributes = {COMPRESSED_HISTORY_ATTRIBUTE: compressed}
+    else:
+        attributes = {HISTORY_ATTRIBUTE: plain}
+
+    raw_bytes = len(json.dumps(data))
+    stored_bytes = len(next(iter(attributes.values())))
+    return attributes, {
+        'messages': len(messages),
+        'raw_bytes': raw_bytes,
+        'stored_bytes': stored_bytes,
+        'bytes_saved': raw_bytes - stored_bytes
+    }
+
+
+def pack_history(summary, messages):
+    """Serialize history to zlib-compressed compact JSON bytes"""
+    data = {'summary': summary, 'messages': messages} if summary else messages
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def unpack_history(blob):
+    """Return (summary, messages) from bytes written by pack_history"""
+    data = json.loads(zlib.decompress(blob))
+    if isinstance(data, list):
+        return '', data
+    return data.get('summary', ''), data.get('messages', [])
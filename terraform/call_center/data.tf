@@ -1,3 +1,7 @@
 data "aws_caller_identity" "current" {}
 
 data "aws_region" "current" {}
+
+data "aws_dynamodb_table" "reservations" {
+  name = "hauliday_reservations"
+}
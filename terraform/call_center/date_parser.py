@@ -0,0 +1,224 @@
+"""
+Local parser for spoken dates and date ranges in caller utterances.
+
+Recognizes forms such as "August 30th", "the 30th of August", "8/30",
+"2025-08-30", "tomorrow", "this Saturday", "next weekend", "next week" and
+ranges like "the 4th through the 6th" or "from August 4th to the 6th". All
+single-date forms are matched in one pass with one compiled regex.
+
+Dates without a year resolve to the current year, following the system prompt
+rule ("July 29th" means July 29th of this year), unless that day has already
+passed, in which case they mean next year: "January 4th" said in late December
+is next month, not eleven months ago. A day with no month ("the 4th") is the
+next such day on or after today.
+"""
+
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+
+DateRange = namedtuple('DateRange', ['start', 'end', 'text'])
+
+# Reservations must start at least this many days after today (no same-day or next-day bookings)
+MIN_BOOKING_LEAD_DAYS = 2
+
+# Reasons a range cannot be booked, returned by booking_window_error
+PAST = 'past'
+TOO_SOON = 'too_soon'
+REVERSED = 'reversed'
+
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6, 'july': 7,
+    'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9,
+    'oct': 10, 'nov': 11, 'dec': 12,
+}
+WEEKDAYS = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+_UNITS = ['first', 'second', 'third', 'fourth', 'fifth', 'sixth', 'seventh', 'eighth', 'ninth']
+ORDINAL_WORDS = {word: day for day, word in enumerate(_UNITS + [
+    'tenth', 'eleventh', 'twelfth', 'thirteenth', 'fourteenth', 'fifteenth', 'sixteenth',
+    'seventeenth', 'eighteenth', 'nineteenth', 'twentieth'], start=1)}
+ORDINAL_WORDS.update({f'twenty {word}': 20 + day for day, word in enumerate(_UNITS, start=1)})
+ORDINAL_WORDS.update({'thirtieth': 30, 'thirty first': 31})
+
+
+def _words(options):
+    return '|'.join(re.escape(option).replace(r'\ ', r'[\s-]') for option in sorted(options, key=len, reverse=True))
+
+
+_MONTH = rf'(?:{_words(MONTHS)})\.?'
+_DAY = rf'(?:\d{{1,2}}(?:st|nd|rd|th)?|{_words(ORDINAL_WORDS)})'
+# Only numeric ordinals stand alone ("the 4th"); "the first" is too often not a date
+_ORDINAL_DAY = r'\d{1,2}(?:st|nd|rd|th)'
+_WEEKDAY = _words(WEEKDAYS)
+
+_DATE = re.compile(
+    rf'\b(?:'
+    rf'(?P<iso>\d{{4}}-\d{{2}}-\d{{2}})'
+    rf'|(?P<num_month>\d{{1,2}})/(?P<num_day>\d{{1,2}})(?:/(?P<num_year>\d{{4}}|\d{{2}}))?'
+    rf'|(?P<md_month>{_MONTH})\s+(?:the\s+)?(?P<md_day>{_DAY})(?:,?\s+(?P<md_year>\d{{4}}))?'
+    rf'|(?:the\s+)?(?P<dm_day>{_DAY})\s+of\s+(?P<dm_month>{_MONTH})'
+    rf'|(?P<relative>day after tomorrow|today|tonight|tomorrow)'
+    rf'|(?:(?P<weekend_modifier>this|next|coming)\s+)?(?P<weekend>weekend)'
+    rf'|(?P<week_modifier>this|next)\s+(?P<week>week)'
+    rf'|(?:(?P<weekday_modifier>this|next|coming)\s+)?(?P<weekday>{_WEEKDAY})'
+    rf'|the\s+(?P<bare_day>{_ORDINAL_DAY})'
+    rf')(?![\w/])'
+)
+# Text allowed between two dates that form a range
+_RANGE_JOIN = re.compile(r'\s*(?:through|thru|to|until|till|-|–)\s*(?:the\s+)?$')
+_BETWEEN = re.compile(r'between\s+$')
+# "August 4th to 6th": a bare day closing a range takes its month from the start
+_RANGE_TAIL = re.compile(rf'\s*(?:through|thru|to|until|till|-|–)\s*(?:the\s+)?(?P<day>{_DAY})(?![\w/])')
+
+
+def _day_number(token):
+    token = ' '.join(token.replace('-', ' ').split())
+    if token in ORDINAL_WORDS:
+        return ORDINAL_WORDS[token]
+    return int(re.match(r'\d+', token).group())
+
+
+def _month_number(token):
+    return MONTHS[token.rstrip('.')]
+
+
+def _next_day_of_month(day, after):
+    """The first date on or after `after` falling on this day of the month"""
+    year, month = after.year, after.month
+    for _ in range(13):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            candidate = None
+        if candidate and candidate >= after:
+            return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    raise ValueError(f'no month has day {day}')
+
+
+def _upcoming(year, month, day, today, explicit_year):
+    """The date for a month and day, rolled into next year when no year was given and it has passed"""
+    resolved = date(year, month, day)
+    if not explicit_year and resolved < today:
+        resolved = date(year + 1, month, day)
+    return resolved
+
+
+def _resolve(match, today):
+    """Return (start, end) for one matched date expression"""
+    groups = match.groupdict()
+    next_monday = today + timedelta(days=7 - today.weekday())
+
+    if groups['iso']:
+        day = date.fromisoformat(groups['iso'])
+        return day, day
+    if groups['num_month']:
+        year = int(groups['num_year']) if groups['num_year'] else today.year
+        year = year + 2000 if year < 100 else year
+        day = _upcoming(year, int(groups['num_month']), int(groups['num_day']), today, groups['num_year'])
+        return day, day
+    if groups['md_month'] or groups['dm_month']:
+        month = _month_number(groups['md_month'] or groups['dm_month'])
+        year = int(groups['md_year']) if groups['md_year'] else today.year
+        day = _upcoming(year, month, _day_number(groups['md_day'] or groups['dm_day']), today, groups['md_year'])
+        return day, day
+    if groups['relative']:
+        offset = {'today': 0, 'tonight': 0, 'tomorrow': 1}.get(groups['relative'], 2)
+        day = today + timedelta(days=offset)
+        return day, day
+    if groups['weekend']:
+        if groups['weekend_modifier'] == 'next':
+            saturday = next_monday + timedelta(days=5)
+        elif today.weekday() == 6:
+            return today, today
+        else:
+            saturday = today + timedelta(days=5 - today.weekday())
+        return saturday, saturday + timedelta(days=1)
+    if groups['week']:
+        if groups['week_modifier'] == 'next':
+            return next_monday, next_monday + timedelta(days=6)
+        return today, next_monday - timedelta(days=1)
+    if groups['weekday']:
+        weekday = WEEKDAYS[groups['weekday']]
+        if groups['weekday_modifier'] == 'next':
+            day = next_monday + timedelta(days=weekday)
+        else:
+            day = today + timedelta(days=(weekday - today.weekday()) % 7)
+        return day, day
+    day = _next_day_of_month(_day_number(groups['bare_day']), today)
+    return day, day
+
+
+def _close_range(start, end):
+    """Roll a range end that wrapped past December into the next year; None if it still runs backwards"""
+    if end < start and end.month < start.month:
+        end = end.replace(year=end.year + 1)
+    return end if end >= start else None
+
+
+def parse_spoken_dates(text, today):
+    """Return the dates and date ranges mentioned in text as DateRange tuples, in order"""
+    text = (text or '').lower()
+    mentions = []
+    for match in _DATE.finditer(text):
+        try:
+            start, end = _resolve(match, today)
+        except ValueError:
+            continue  # e.g. "February 30th" or "24/7"
+        mentions.append((match, start, end))
+
+    ranges = []
+    index = 0
+    while index < len(mentions):
+        match, start, end = mentions[index]
+        span_start, span_end = match.start(), match.end()
+
+        if index + 1 < len(mentions):
+            next_match, next_start, next_end = mentions[index + 1]
+            between = text[span_end:next_match.start()]
+            joined = _RANGE_JOIN.match(between) or (
+                between.strip() == 'and' and _BETWEEN.search(text, 0, span_start))
+            range_end = None
+            if joined:
+                # A bare closing day ("August 4th through the 6th") follows the start's month
+                if next_match.group('bare_day'):
+                    next_end = _next_day_of_month(_day_number(next_match.group('bare_day')), start)
+                range_end = _close_range(start, next_end)
+            if range_end:
+                ranges.append(DateRange(start, range_end, text[span_start:next_match.end()]))
+                index += 2
+                continue
+
+        tail = _RANGE_TAIL.match(text, span_end)
+        if tail and start == end:
+            try:
+                range_end = _next_day_of_month(_day_number(tail.group('day')), start)
+            except ValueError:
+                range_end = None
+            if range_end:
+                ranges.append(DateRange(start, range_end, text[span_start:tail.end()]))
+                index += 1
+                continue
+
+        ranges.append(DateRange(start, end, text[span_start:span_end]))
+        index += 1
+    return ranges
+
+
+def earliest_booking_date(today):
+    return today + timedelta(days=MIN_BOOKING_LEAD_DAYS)
+
+
+def booking_window_error(start, end, today):
+    """Return PAST, TOO_SOON or REVERSED when a range cannot be booked, else None"""
+    if end < start:
+        return REVERSED
+    if start < today:
+        return PAST
+    if start < earliest_booking_date(today):
+        return TOO_SOON
+    return None
@@ -0,0 +1,139 @@
+"""
+Deterministic answers for catalog and pricing questions that don't need the model.
+
+The resolver only answers when the utterance is clearly a price, catalog or
+"tell me about" question and mentions nothing date- or booking-related;
+anything else returns None so the caller falls back to Bedrock.
+"""
+
+import re
+import threading
+
+EQUIPMENT_ALIASES = {
+    'cotton-candy': ['cotton candy', 'candy machine', 'candy floss'],
+    'cargo-carrier': ['cargo carrier', 'cargo box', 'roof box', 'yakima', 'carrier'],
+    'snow-cone': ['snow cone', 'sno cone', 'snowcone', 'shaved ice'],
+    'castle-bounce': ['castle bounce house', 'castle bounce', 'castle'],
+    'water-slide-bounce': ['water slide bounce house', 'water slide', 'waterslide'],
+    'obstacle-bounce': ['obstacle course bounce house', 'obstacle course', 'obstacle'],
+    'utility-trailer': ['utility trailer', 'trailer'],
+    'single-kayak': ['single kayak', 'solo kayak', 'one person kayak', 'one-person kayak'],
+    'tandem-kayak': ['tandem kayak', 'double kayak', 'two person kayak', 'two-person kayak'],
+    'paddleboard': ['stand up paddleboard', 'stand up paddle board', 'paddleboard', 'paddle board', 'sup'],
+}
+
+# Generic names that cover several items; answered with every matching item
+AMBIGUOUS_ALIASES = {
+    'kayak': ['single-kayak', 'tandem-kayak'],
+    'kayaks': ['single-kayak', 'tandem-kayak'],
+    'bounce house': ['castle-bounce', 'water-slide-bounce', 'obstacle-bounce'],
+    'bounce houses': ['castle-bounce', 'water-slide-bounce', 'obstacle-bounce'],
+    'bouncer': ['castle-bounce', 'water-slide-bounce', 'obstacle-bounce'],
+}
+
+_PRICE = re.compile(r"\b(?:how much|price|prices|pricing|cost|costs|rate|rates|per day|charge)\b")
+_CATALOG = re.compile(
+    r"\b(?:what (?:equipment|items|things|stuff)|what do you (?:have|rent|offer)|what can i rent"
+    r"|what kind of|what are (?:my|the|your) options|what all do you|your (?:equipment|inventory|catalog)"
+    r"|list (?:of )?(?:your|the) equipment)\b"
+)
+# Price questions without an item only get the catalog when they ask about prices in general;
+# "how much is it?" refers back to earlier turns and needs the model
+_GENERAL_PRICES = re.compile(r"\b(?:prices|pricing|rates|costs|your price)\b")
+_DESCRIBE = re.compile(r"\b(?:tell me (?:more )?about|what is the|what's the|describe|details (?:on|about))\b")
+
+# Anything date-, booking- or comparison-related needs the model and tools
+_NEEDS_MODEL = re.compile(
+    r"\b(?:availability|free|open|reserve|reservation|book|booking|rent it|"
+    r"today|tonight|tomorrow|weekend|week|month|next|this|on the|from|until|through|"
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"discount|deposit|deliver|delivery|pickup|pick up|cheaper|cheapest|recommend|better|compare|"
+    r"instead|cancel|refund|insurance|hours)\b|\d"
+)
+# "What do you have available?" is still a catalog question; "is it available" elsewhere is not
+_AVAILABLE = re.compile(r"\bavailable\b")
+
+MAX_WORDS = 20
+
+
+def _alias_pattern(aliases):
+    ordered = sorted(aliases, key=len, reverse=True)
+    return re.compile(r'\b(' + '|'.join(re.escape(alias) for alias in ordered) + r')\b')
+
+
+class FastPathResolver:
+    """Answers catalog, price and description questions directly from the equipment catalog"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._alias_to_ids = {}
+        for equipment_id, aliases in EQUIPMENT_ALIASES.items():
+            if equipment_id in catalog:
+                for alias in aliases:
+                    self._alias_to_ids.setdefault(alias, [equipment_id])
+        for alias, equipment_ids in AMBIGUOUS_ALIASES.items():
+            self._alias_to_ids.setdefault(alias, [equipment_id for equipment_id in equipment_ids if equipment_id in catalog])
+        self._aliases = _alias_pattern(self._alias_to_ids)
+        self.attempts = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def find_equipment(self, text):
+        """Return catalog IDs mentioned in the text, in order of first mention"""
+        found = []
+        for match in self._aliases.finditer(text.lower()):
+            for equipment_id in self._alias_to_ids[match.group(1)]:
+                if equipment_id not in found:
+                    found.append(equipment_id)
+        return found
+
+    def resolve(self, text):
+        """Return a direct answer, or None when the model should handle the utterance"""
+        answer = self._answer(text)
+        with self._lock:
+            self.attempts += 1
+            if answer:
+                self.hits += 1
+        return answer
+
+    def _answer(self, text):
+        text = ' '.join((text or '').lower().replace('?', ' ').split())
+        if not text or len(text.split()) > MAX_WORDS or _NEEDS_MODEL.search(text):
+            return None
+
+        equipment_ids = self.find_equipment(text)
+        if _CATALOG.search(text) and not equipment_ids:
+            return self.catalog_answer()
+        if _AVAILABLE.search(text):
+            return None
+        if _PRICE.search(text):
+            if equipment_ids:
+                return self.price_answer(equipment_ids)
+            return self.catalog_answer() if _GENERAL_PRICES.search(text) else None
+        if _DESCRIBE.search(text) and len(equipment_ids) == 1:
+            return self.description_answer(equipment_ids[0])
+        return None
+
+    def price_answer(self, equipment_ids):
+        prices = [f"the {self.catalog[equipment_id]['name']} is ${self.catalog[equipment_id]['price_per_day']} per day"
+                  for equipment_id in equipment_ids]
+        sentence = prices[0] if len(prices) == 1 else ', '.join(prices[:-1]) + ' and ' + prices[-1]
+        return f"{sentence[0].upper()}{sentence[1:]}. Would you like to check availability for specific dates?"
+
+    def catalog_answer(self):
+        items = [f"{equipment['name']} at ${equipment['price_per_day']} a day" for equipment in self.catalog.values()]
+        return f"We rent the {', '.join(items[:-1])}, and {items[-1]}. Which one are you interested in?"
+
+    def description_answer(self, equipment_id):
+        equipment = self.catalog[equipment_id]
+        return (f"The {equipment['name']}: {equipment['description']} It's ${equipment['price_per_day']} per day. "
+                f"Would you like to check availability?")
+
+    def stats(self):
+        """Return attempt/hit counters and the fast-path hit rate"""
+        return {
+            'attempts': self.attempts,
+            'hits': self.hits,
+            'hit_rate': round(self.hits / self.attempts, 3) if self.attempts else 0.0
+        }
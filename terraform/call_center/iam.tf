@@ -84,6 +84,7 @@ resource "aws_iam_role_policy" "lambda_bedrock_access" {
         Effect = "Allow"
         Action = [
           "bedrock:InvokeModel",
+          "bedrock:InvokeModelWithResponseStream",
           "bedrock:RetrieveAndGenerate",
           "bedrock:Retrieve"
         ]
@@ -129,7 +130,38 @@ resource "aws_iam_role_policy" "lambda_dynamodb_access" {
           "dynamodb:Scan",
           "dynamodb:Query"
         ]
-        Resource = "arn:aws:dynamodb:${data.aws_region.current.id}:${data.aws_caller_identity.current.account_id}:table/hauliday_reservations"
+        Resource = [
+          "arn:aws:dynamodb:${data.aws_region.current.id}:${data.aws_caller_identity.current.account_id}:table/hauliday_reservations",
+          "arn:aws:dynamodb:${data.aws_region.current.id}:${data.aws_caller_identity.current.account_id}:table/hauliday_reservations/index/*",
+          "arn:aws:dynamodb:${data.aws_region.current.id}:${data.aws_caller_identity.current.account_id}:table/hauliday_equipment_calendar",
+          aws_dynamodb_table.connect_sessions.arn
+        ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "dynamodb:DescribeStream",
+          "dynamodb:GetRecords",
+          "dynamodb:GetShardIterator",
+          "dynamodb:ListStreams"
+        ]
+        Resource = "arn:aws:dynamodb:${data.aws_region.current.id}:${data.aws_caller_identity.current.account_id}:table/hauliday_reservations/stream/*"
+      }
+    ]
+  })
+}
+
+resource "aws_iam_role_policy" "lambda_calendar_stream_failures" {
+  name = "${var.project_name}-lambda-calendar-stream-failures-policy"
+  role = aws_iam_role.lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect   = "Allow"
+        Action   = ["sqs:SendMessage"]
+        Resource = aws_sqs_queue.calendar_stream_failures.arn
       }
     ]
   })
@@ -0,0 +1,106 @@
+"""
+Precompiled keyword matcher for caller utterances.
+
+All rental keywords are compiled into a single prefix-factored alternation
+regex at import time, so one findall pass over an utterance yields every
+matched keyword and its category. Keywords match as substrings, the same way the
+original ``any(keyword in message_lower ...)`` check did.
+"""
+
+import re
+from collections import namedtuple
+
+KEYWORD_CATEGORIES = {
+    'equipment': [
+        "cotton candy", "candy machine", "snow cone", "sno cone", "bounce house", "bouncer", "castle", "slide",
+        "water slide", "obstacle course", "cargo", "carrier", "yakima", "trailer", "utility trailer",
+        "kayak", "single kayak", "tandem kayak", "paddleboard", "sup", "stand up paddle", "paddle board",
+    ],
+    'rental_term': [
+        "rent", "rental", "reserve", "reservation", "book", "booking", "available", "availability",
+        "price", "cost", "equipment", "machine", "dates", "schedule",
+    ],
+    'inquiry': [
+        "what", "when", "where", "how", "can", "do", "does", "is", "are", "have", "need", "want",
+    ],
+    'greeting': [
+        "hello", "hi", "hey", "help", "thanks", "thank you",
+    ],
+}
+
+# Only clear goodbye phrases or explicit no/done responses end the call
+GOODBYE_PHRASES = [
+    'goodbye', 'bye', 'bye bye', 'hang up', 'end call', 'no more questions',
+    'that\'s all', 'thats all', 'that\'s it', 'thats it', 'i\'m done', 'im done',
+    'i\'m good', 'im good', 'no thanks', 'no thank you'
+]
+
+IntentMatch = namedtuple('IntentMatch', ['categories', 'keywords', 'is_goodbye'])
+
+_KEYWORD_CATEGORY = {}
+for _category, _keywords in KEYWORD_CATEGORIES.items():
+    for _keyword in _keywords:
+        _KEYWORD_CATEGORY.setdefault(_keyword, _category)
+
+
+def _alternation(phrases):
+    """
+    Build a prefix-factored alternation ("book(?:ing)?" rather than "book|booking").
+
+    Factoring shared prefixes keeps the regex engine from retrying every keyword
+    at each position, and the optional suffixes are greedy so the longest
+    keyword wins at a given position.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for character in phrase:
+            node = node.setdefault(character, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(character) + build(child) for character, child in sorted(node.items()) if character]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if '' in node else group
+
+    return build(trie)
+
+
+_KEYWORD_SEARCH = re.compile(_alternation(_KEYWORD_CATEGORY))
+# One findall pass yields the longest keyword at each position; this table expands each match
+# into itself and the keywords nested inside it ("water slide" also counts as "slide")
+_KEYWORD_EXPANSION = {
+    keyword: (keyword,) + tuple(other for other in _KEYWORD_CATEGORY if other != keyword and other in keyword)
+    for keyword in _KEYWORD_CATEGORY
+}
+# Exactly no/nope, a goodbye phrase alone or leading the utterance, or one ending it
+_GOODBYES = _alternation(GOODBYE_PHRASES)
+_GOODBYE = re.compile(rf'no|nope|(?:{_GOODBYES})(?: .*)?|.* (?:{_GOODBYES})', re.DOTALL)
+
+
+def is_rental_message(message):
+    """Return True if the message mentions any rental keyword"""
+    if not message or not message.strip():
+        return False
+    return _KEYWORD_SEARCH.search(message.lower()) is not None
+
+
+def is_goodbye(message):
+    """Return True if the message is a clear request to end the call"""
+    return _GOODBYE.fullmatch(message.lower().strip()) is not None
+
+
+def match_intents(message):
+    """Return the matched keyword categories, keywords and goodbye flag for an utterance"""
+    text = (message or '').lower()
+    keywords = tuple(dict.fromkeys(keyword for match in _KEYWORD_SEARCH.findall(text)
+                                   for keyword in _KEYWORD_EXPANSION[match]))
+    categories = frozenset(_KEYWORD_CATEGORY[keyword] for keyword in keywords)
+    goodbye = _GOODBYE.fullmatch(text.strip()) is not None
+    if goodbye:
+        categories |= {'goodbye'}
+    return IntentMatch(categories, keywords, goodbye)
@@ -0,0 +1,429 @@
+"""
+Local stand-ins for the AWS services used by the rental Lambda.
+
+These are for local testing only and are not packaged into the Lambda zip.
+"""
+
+import io
+import json
+import re
+import threading
+import time
+from copy import deepcopy
+from datetime import date, datetime
+
+_CLAUSE = re.compile(r'^\s*([#\w]+)\s*(<>|<=|>=|=|<|>)\s*(:\w+)\s*$')
+
+_OPERATORS = {
+    '=': lambda a, b: a == b,
+    '<>': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+
+
+def _matches(item, expression, names, values):
+    """Evaluate a simple 'a op :b AND c op :d' expression against an item"""
+    if not expression:
+        return True
+    for clause in re.split(r'\s+AND\s+', expression):
+        match = _CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f'Unsupported expression clause: {clause}')
+        attribute, operator, placeholder = match.groups()
+        attribute = names.get(attribute, attribute)
+        if attribute not in item:
+            if operator == '<>':
+                continue
+            return False
+        if not _OPERATORS[operator](item[attribute], values[placeholder]):
+            return False
+    return True
+
+
+def _sleep(latency):
+    """Sleep for a latency given in seconds or as a callable returning seconds"""
+    seconds = latency() if callable(latency) else latency
+    if seconds:
+        time.sleep(seconds)
+
+
+class ConditionalCheckFailed(Exception):
+    """Mimics botocore's ClientError for a failed ConditionExpression"""
+
+    def __init__(self):
+        super().__init__('The conditional request failed')
+        self.response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+
+
+_ATTRIBUTE_NOT_EXISTS = re.compile(r'^\s*attribute_not_exists\((\w+)\)\s*$')
+
+
+class LocalTable:
+    """
+    In-memory DynamoDB table supporting the subset of the Table API used here.
+
+    ``page_size`` caps how many items a single query/scan evaluates before
+    returning a LastEvaluatedKey, which stands in for DynamoDB's 1 MB page limit.
+    ``latency`` is slept on every get_item and query/scan page to simulate network
+    round trips; it is either seconds or a callable returning seconds per call.
+    """
+
+    def __init__(self, name, hash_key, range_key=None, indexes=None, items=None, page_size=None, latency=0.0):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = indexes or {}
+        self.page_size = page_size
+        self.latency = latency
+        self.items = []
+        self.calls = []
+        for item in items or []:
+            self.put_item(Item=item)
+
+    def _key_attributes(self, index_name=None):
+        if index_name:
+            return self.indexes[index_name]
+        return self.hash_key, self.range_key
+
+    def _key(self, item):
+        return tuple(item.get(attribute) for attribute in (self.hash_key, self.range_key) if attribute)
+
+    def put_item(self, Item, **kwargs):
+        self.calls.append(('put_item', Item))
+        key = self._key(Item)
+        condition = kwargs.get('ConditionExpression')
+        if condition:
+            existing = next((item for item in self.items if self._key(item) == key), None)
+            not_exists = _ATTRIBUTE_NOT_EXISTS.match(condition)
+            if not_exists:
+                passed = existing is None or not_exists.group(1) not in existing
+            else:
+                passed = existing is not None and _matches(
+                    existing, condition, kwargs.get('ExpressionAttributeNames', {}),
+                    kwargs.get('ExpressionAttributeValues', {}))
+            if not passed:
+                raise ConditionalCheckFailed()
+        self.items = [existing for existing in self.items if self._key(existing) != key]
+        self.items.append(deepcopy(Item))
+        return {}
+
+    def get_item(self, Key, **kwargs):
+        self.calls.append(('get_item', Key))
+        _sleep(self.latency)
+        key = self._key(Key)
+        for item in self.items:
+            if self._key(item) == key:
+                return {'Item': deepcopy(item)}
+        return {}
+
+    def delete_item(self, Key, **kwargs):
+        self.calls.append(('delete_item', Key))
+        key = self._key(Key)
+        self.items = [item for item in self.items if self._key(item) != key]
+        return {}
+
+    def _page(self, candidates, kwargs, key_attributes):
+        names = kwargs.get('ExpressionAttributeNames', {})
+        values = kwargs.get('ExpressionAttributeValues', {})
+        hash_attribute, range_attribute = key_attributes
+        candidates = sorted(candidates, key=lambda item: (str(item.get(hash_attribute)), str(item.get(range_attribute, ''))))
+
+        start_key = kwargs.get('ExclusiveStartKey')
+        if start_key:
+            for position, item in enumerate(candidates):
+                if all(item.get(attribute) == value for attribute, value in start_key.items()):
+                    candidates = candidates[position + 1:]
+                    break
+
+        limit = kwargs.get('Limit') or self.page_size
+        evaluated = candidates[:limit] if limit else candidates
+        filtered = [deepcopy(item) for item in evaluated
+                    if _matches(item, kwargs.get('FilterExpression'), names, values)]
+
+        response = {'Items': filtered, 'Count': len(filtered), 'ScannedCount': len(evaluated)}
+        if limit and len(candidates) > limit:
+            last = evaluated[-1]
+            key_names = {hash_attribute, range_attribute, self.hash_key, self.range_key} - {None}
+            response['LastEvaluatedKey'] = {attribute: last[attribute] for attribute in key_names if attribute in last}
+        return response
+
+    def query(self, **kwargs):
+        self.calls.append(('query', kwargs))
+        _sleep(self.latency)
+        names = kwargs.get('ExpressionAttributeNames', {})
+        values = kwargs.get('ExpressionAttributeValues', {})
+        key_attributes = self._key_attributes(kwargs.get('IndexName'))
+        candidates = [item for item in self.items
+                      if all(attribute in item for attribute in key_attributes if attribute)
+                      and _matches(item, kwargs['KeyConditionExpression'], names, values)]
+        return self._page(candidates, kwargs, key_attributes)
+
+    def scan(self, **kwargs):
+        self.calls.append(('scan', kwargs))
+        _sleep(self.latency)
+        return self._page(list(self.items), kwargs, (self.hash_key, self.range_key))
+
+
+class LocalDynamoDBResource:
+    """Stand-in for ``boto3.resource('dynamodb')`` returning registered LocalTables"""
+
+    def __init__(self, *tables):
+        self.tables = {table.name: table for table in tables}
+
+    def Table(self, name):
+        return self.tables[name]
+
+
+def calendar_table(items=None):
+    """Create a LocalTable shaped like hauliday_equipment_calendar (see terraform/storage/ddb.tf)"""
+    return LocalTable('hauliday_equipment_calendar', hash_key='equipment_id', items=items)
+
+
+def sessions_table(items=None):
+    """Create a LocalTable shaped like the Connect session table (see main.tf)"""
+    return LocalTable('call_center_sessions', hash_key='contact_id', items=items)
+
+
+def reservations_table(items=None, page_size=None, latency=0.0):
+    """Create a LocalTable shaped like hauliday_reservations (see terraform/storage/ddb.tf)"""
+    return LocalTable(
+        'hauliday_reservations',
+        hash_key='reservation_id',
+        range_key='start_date',
+        indexes={'EquipmentDateIndex': ('equipment_id', 'start_date')},
+        items=items,
+        page_size=page_size,
+        latency=latency
+    )
+
+
+class FakeEventStream:
+    """Iterable stand-in for a botocore EventStream that records how far it was read"""
+
+    def __init__(self, events, latency_per_event=0.0):
+        self.events = events
+        self.latency_per_event = latency_per_event
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            if self.closed:
+                return
+            if self.latency_per_event:
+                time.sleep(self.latency_per_event)
+            self.consumed += 1
+            yield {'chunk': {'bytes': json.dumps(event).encode('utf-8')}}
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBedrockRuntime:
+    """
+    Stand-in for the bedrock-runtime client that answers Anthropic Messages payloads.
+
+    ``responder`` is either a fixed reply or a callable taking (payload, model_id)
+    and returning one. ``latency`` is seconds, or a callable returning seconds
+    per call. A reply is a text string or a list of content blocks; a reply
+    containing tool_use blocks ends with stop_reason ``tool_use``. Each entry
+    in ``requests`` records the payload, the reply content and its usage.
+    """
+
+    def __init__(self, responder, chunk_size=8, latency=0.0, latency_per_chunk=0.0):
+        self.responder = responder
+        self.chunk_size = chunk_size
+        self.latency = latency
+        self.latency_per_chunk = latency_per_chunk
+        self.requests = []
+
+    def _reply(self, body, model_id):
+        payload = json.loads(body)
+        request = {'model_id': model_id, 'payload': payload}
+        self.requests.append(request)
+        _sleep(self.latency)
+        reply = self.responder(payload, model_id) if callable(self.responder) else self.responder
+        content = [{'type': 'text', 'text': reply}] if isinstance(reply, str) else deepcopy(reply)
+        for position, block in enumerate(content):
+            if block['type'] == 'tool_use':
+                block.setdefault('id', f'toolu_{len(self.requests)}_{position}')
+        stop_reason = 'tool_use' if any(block['type'] == 'tool_use' for block in content) else 'end_turn'
+        output_length = sum(len(block.get('text', '')) + len(json.dumps(block.get('input', ''))) for block in content)
+        usage = {'input_tokens': len(body) // 4, 'output_tokens': max(1, output_length // 4)}
+        request.update(content=content, usage=usage)
+        return content, stop_reason, usage
+
+    def invoke_model(self, body, modelId, **kwargs):
+        content, stop_reason, usage = self._reply(body, modelId)
+        message = {
+            'type': 'message',
+            'role': 'assistant',
+            'content': content,
+            'stop_reason': stop_reason,
+            'usage': usage
+        }
+        return {'body': io.BytesIO(json.dumps(message).encode('utf-8'))}
+
+    def invoke_model_with_response_stream(self, body, modelId, **kwargs):
+        content, stop_reason, usage = self._reply(body, modelId)
+        events = [{'type': 'message_start', 'message': {'role': 'assistant', 'usage': {'input_tokens': usage['input_tokens']}}}]
+
+        for index, block in enumerate(content):
+            if block['type'] == 'text':
+                events.append({'type': 'content_block_start', 'index': index, 'content_block': {'type': 'text', 'text': ''}})
+                text = block['text']
+                for position in range(0, len(text), self.chunk_size):
+                    events.append({'type': 'content_block_delta', 'index': index,
+                                   'delta': {'type': 'text_delta', 'text': text[position:position + self.chunk_size]}})
+            else:
+                events.append({'type': 'content_block_start', 'index': index,
+                               'content_block': {'type': 'tool_use', 'id': block['id'], 'name': block['name'], 'input': {}}})
+                raw_input = json.dumps(block.get('input', {}))
+                for position in range(0, len(raw_input), self.chunk_size):
+                    events.append({'type': 'content_block_delta', 'index': index,
+                                   'delta': {'type': 'input_json_delta', 'partial_json': raw_input[position:position + self.chunk_size]}})
+            events.append({'type': 'content_block_stop', 'index': index})
+
+        events += [
+            {'type': 'message_delta', 'delta': {'stop_reason': stop_reason}, 'usage': {'output_tokens': usage['output_tokens']}},
+            {'type': 'message_stop'},
+        ]
+        return {'body': FakeEventStream(events, self.latency_per_chunk)}
+
+
+_BOOKING = re.compile(r'\b(?:book|reserve)\b', re.IGNORECASE)
+_CALLER_NAME = re.compile(r"\bmy name is ([a-z]+(?: [a-z]+)?)", re.IGNORECASE)
+_CALLER_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.]+')
+_CALLER_PHONE = re.compile(r'\b\d{3}[ -]?\d{3}[ -]?\d{4}\b')
+
+
+def scripted_model(catalog, today=None):
+    """
+    Deterministic responder for FakeBedrockRuntime that behaves enough like Claude for replays.
+
+    An utterance naming catalog items and a date asks for check_availability;
+    "book" or "reserve" asks for create_reservation with the most recent item
+    and dates mentioned in the conversation and any name, email or phone the
+    caller gave. Calls are native tool_use blocks when the payload offers tools
+    and directives otherwise. Tool results are read back as one sentence each,
+    goodbyes get a sign-off and anything else a short clarifying question. ``today`` defaults to the
+    current UTC date on every call.
+    """
+    from date_parser import parse_spoken_dates
+    from fast_path import FastPathResolver
+    from intent_matcher import is_goodbye
+
+    resolver = FastPathResolver(catalog)
+
+    def booking_call(payload, day):
+        user_texts = [message['content'] for message in payload['messages']
+                      if message['role'] == 'user' and isinstance(message['content'], str)]
+        equipment_ids = next((found for found in map(resolver.find_equipment, reversed(user_texts)) if found), [])
+        dates = next((found for found in (parse_spoken_dates(text, day) for text in reversed(user_texts)) if found), [])
+        if not (equipment_ids and dates):
+            return 'Which item and which dates would you like to book?'
+        caller = ' '.join(user_texts)
+        name, email, phone = (_CALLER_NAME.search(caller), _CALLER_EMAIL.search(caller), _CALLER_PHONE.search(caller))
+        details = {'equipment_id': equipment_ids[0], 'start_date': dates[0].start.isoformat(),
+                   'end_date': dates[0].end.isoformat()}
+        details.update({field: match.group(match.lastindex or 0) for field, match
+                        in (('name', name), ('email', email), ('phone', phone)) if match})
+        if 'tools' in payload:
+            return [{'type': 'tool_use', 'name': 'create_reservation', 'input': details}]
+        return (f"CREATE_RESERVATION:{details['equipment_id']},{details['start_date']},{details['end_date']},"
+                f"{details.get('name', 'caller')},{details.get('email', 'none')},{details.get('phone', '')}")
+
+    def respond(payload, model_id):
+        day = today or datetime.utcnow().date()
+        last = payload['messages'][-1]['content']
+        if isinstance(last, list):
+            results = [block for block in last if block.get('type') == 'tool_result']
+            if results:
+                return ' '.join(_spoken_result(result) for result in results)
+            last = ' '.join(block.get('text', '') for block in last)
+        if is_goodbye(last):
+            return 'Thanks for calling Hauliday Rentals. Goodbye!'
+        if _BOOKING.search(last):
+            return booking_call(payload, day)
+        equipment_ids = resolver.find_equipment(last)
+        dates = parse_spoken_dates(last, day)
+        if equipment_ids and dates:
+            start, end = dates[0].start.isoformat(), dates[0].end.isoformat()
+            if 'tools' in payload:
+                return [{'type': 'tool_use', 'name': 'check_availability',
+                         'input': {'equipment_id': equipment_id, 'start_date': start, 'end_date': end}}
+                        for equipment_id in equipment_ids]
+            return '\n'.join(f'CHECK_AVAILABILITY:{equipment_id},{start},{end}' for equipment_id in equipment_ids)
+        return 'Happy to help with your equipment rental. Which item and which dates do you have in mind?'
+    return respond
+
+
+def _spoken_result(result):
+    try:
+        content = json.loads(result['content'])
+    except (TypeError, ValueError):
+        return f"Sorry, I couldn't check that: {result['content']}."
+    day = date.fromisoformat(content['start_date'])
+    if 'instructions' in content:
+        return (f"To complete your reservation for the {content['equipment']} starting {day:%B} {day.day}, "
+                f"please go to haulidayrentals.com.")
+    status = 'available' if content['available'] else 'not available'
+    return f"The {content['equipment']} is {status} on {day:%B} {day.day}. Would you like to make a reservation?"
+
+
+class LocalLambdaClient:
+    """
+    Stand-in for the lambda client that invokes a handler in-process.
+
+    Invocations are serialized, as one warm container handles one event at a time.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.invocations = []
+        self._lock = threading.Lock()
+
+    def invoke(self, FunctionName, Payload, **kwargs):
+        with self._lock:
+            self.invocations.append(FunctionName)
+            try:
+                result, error = self.handler(json.loads(Payload), None), None
+            except Exception as exception:
+                result, error = {'errorMessage': str(exception), 'errorType': type(exception).__name__}, 'Unhandled'
+        response = {'StatusCode': 200, 'Payload': io.BytesIO(json.dumps(result).encode('utf-8'))}
+        if error:
+            response['FunctionError'] = error
+        return response
+
+
+class LocalLexRuntime:
+    """Stand-in for lexv2-runtime: RentalQueryIntent for utterances the classifier accepts, else FallbackIntent"""
+
+    def __init__(self, classifier, confidence=0.95):
+        self.classifier = classifier
+        self.confidence = confidence
+        self.sessions = {}
+
+    def recognize_text(self, botId, botAliasId, localeId, sessionId, text, **kwargs):
+        self.sessions.setdefault(sessionId, []).append(text)
+        matched = self.classifier(text)
+        intent = 'RentalQueryIntent' if matched else 'FallbackIntent'
+        return {
+            'sessionId': sessionId,
+            'sessionState': {'intent': {'name': intent, 'state': 'InProgress'}},
+            'interpretations': [{'intent': {'name': intent},
+                                 'nluConfidence': {'score': self.confidence if matched else 0.3}}],
+        }
+
+
+class LocalConnectClient:
+    """Stand-in for the connect client that lists a fixed set of associated Lex V2 bot aliases"""
+
+    def __init__(self, alias_arns=()):
+        self.alias_arns = list(alias_arns)
+
+    def list_bots(self, InstanceId, LexVersion, **kwargs):
+        return {'LexBots': [{'LexV2Bot': {'AliasArn': alias_arn}} for alias_arn in self.alias_arns]}
@@ -188,8 +188,33 @@ resource "aws_lambda_function" "rental_query" {
 
   environment {
     variables = {
-      DYNAMODB_TABLE_NAME = "hauliday_reservations"
-      MODEL_ID            = var.bedrock_model_id
+      DYNAMODB_TABLE_NAME     = "hauliday_reservations"
+      RESERVATIONS_INDEX_NAME = "EquipmentDateIndex"
+      MODEL_ID                = var.bedrock_model_id
+      MODEL_ROUTING           = "true"
+      FAST_MODEL_ID           = var.bedrock_fast_model_id
+      MODEL_ROUTE_OVERRIDES   = var.model_route_overrides
+      MAX_OUTPUT_TOKENS       = "1000"
+      CALL_TOKEN_BUDGET       = "150000"
+      BEDROCK_TURN_BUDGET_MS  = "8000"
+      BEDROCK_HEDGING         = "true"
+      CIRCUIT_RESET_SECONDS   = "30"
+      BEDROCK_STREAMING       = "true"
+      PROMPT_CACHING          = "auto"
+      TOOL_MODE               = "native"
+      MAX_TOOL_ITERATIONS     = "3"
+      HISTORY_TOKEN_BUDGET    = "1500"
+      FAST_PATH_ENABLED       = "true"
+      RESPONSE_CACHE_ENABLED  = "true"
+      COLD_START_PROFILE      = "false"
+      LOG_LEVEL               = "INFO"
+      LOG_SAMPLE_RATE         = "0.01"
+      METRICS_ENABLED         = "true"
+      PREFETCH_ENABLED        = "true"
+      AVAILABILITY_SOURCE     = "reservations"
+      CALENDAR_TABLE_NAME     = "hauliday_equipment_calendar"
+      SESSION_TABLE_NAME      = aws_dynamodb_table.connect_sessions.name
+      SESSION_TTL_SECONDS     = "3600"
     }
   }
 
@@ -202,6 +227,30 @@ resource "aws_lambda_function" "rental_query" {
   ]
 }
 
+################################################################################
+# Connect Session Store
+################################################################################
+
+# Conversation history for direct Connect invocations, one item per ContactId.
+# Items expire through DynamoDB TTL an hour after the last turn.
+resource "aws_dynamodb_table" "connect_sessions" {
+  name         = "call_center_sessions"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "contact_id"
+
+  attribute {
+    name = "contact_id"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = var.tags
+}
+
 # # CloudWatch Log Group for Lambda
 # resource "aws_cloudwatch_log_group" "lambda_logs" {
 #   name              = "/aws/lambda/${var.project_name}-knowledge-base-query"
@@ -218,6 +267,144 @@ data "archive_file" "lambda_zip" {
     content  = file("${path.module}/lambda_function.py")
     filename = "lambda_function.py"
   }
+  source {
+    content  = file("${path.module}/availability.py")
+    filename = "availability.py"
+  }
+  source {
+    content  = file("${path.module}/ttl_cache.py")
+    filename = "ttl_cache.py"
+  }
+  source {
+    content  = file("${path.module}/bedrock_streaming.py")
+    filename = "bedrock_streaming.py"
+  }
+  source {
+    content  = file("${path.module}/tools.py")
+    filename = "tools.py"
+  }
+  source {
+    content  = file("${path.module}/conversation_history.py")
+    filename = "conversation_history.py"
+  }
+  source {
+    content  = file("${path.module}/intent_matcher.py")
+    filename = "intent_matcher.py"
+  }
+  source {
+    content  = file("${path.module}/fast_path.py")
+    filename = "fast_path.py"
+  }
+  source {
+    content  = file("${path.module}/response_cache.py")
+    filename = "response_cache.py"
+  }
+  source {
+    content  = file("${path.module}/aws_clients.py")
+    filename = "aws_clients.py"
+  }
+  source {
+    content  = file("${path.module}/cold_start.py")
+    filename = "cold_start.py"
+  }
+  source {
+    content  = file("${path.module}/structured_logging.py")
+    filename = "structured_logging.py"
+  }
+  source {
+    content  = file("${path.module}/metrics.py")
+    filename = "metrics.py"
+  }
+  source {
+    content  = file("${path.module}/prefetch.py")
+    filename = "prefetch.py"
+  }
+  source {
+    content  = file("${path.module}/date_parser.py")
+    filename = "date_parser.py"
+  }
+  source {
+    content  = file("${path.module}/reservation_calendar.py")
+    filename = "reservation_calendar.py"
+  }
+  source {
+    content  = file("${path.module}/calendar_stream_handler.py")
+    filename = "calendar_stream_handler.py"
+  }
+  source {
+    content  = file("${path.module}/model_router.py")
+    filename = "model_router.py"
+  }
+  source {
+    content  = file("${path.module}/bedrock_resilience.py")
+    filename = "bedrock_resilience.py"
+  }
+  source {
+    content  = file("${path.module}/session_store.py")
+    filename = "session_store.py"
+  }
+  source {
+    content  = file("${path.module}/token_usage.py")
+    filename = "token_usage.py"
+  }
+}
+
+################################################################################
+# Equipment Calendar Stream Consumer
+################################################################################
+
+# Keeps hauliday_equipment_calendar in sync with reservation writes. Ships in the same
+# package as the rental Lambda; invoke it with {"action": "rebuild"} to backfill.
+resource "aws_lambda_function" "calendar_stream" {
+  filename         = data.archive_file.lambda_zip.output_path
+  function_name    = "${var.project_name}-calendar-stream"
+  role             = aws_iam_role.lambda_role.arn
+  handler          = "calendar_stream_handler.lambda_handler"
+  runtime          = "python3.11"
+  timeout          = 60
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE_NAME = "hauliday_reservations"
+      CALENDAR_TABLE_NAME = "hauliday_equipment_calendar"
+      LOG_LEVEL           = "INFO"
+    }
+  }
+
+  tags = var.tags
+
+  depends_on = [
+    aws_iam_role_policy_attachment.lambda_basic_execution,
+    aws_iam_role_policy.lambda_dynamodb_access,
+  ]
+}
+
+# Stream batches that still fail after their retries. Their reservations are missing from the
+# calendar until it is rebuilt, so a non-empty queue means running the rebuild for those items.
+resource "aws_sqs_queue" "calendar_stream_failures" {
+  name                      = "${var.project_name}-calendar-stream-failures"
+  message_retention_seconds = 1209600
+
+  tags = var.tags
+}
+
+resource "aws_lambda_event_source_mapping" "reservation_stream" {
+  event_source_arn               = data.aws_dynamodb_table.reservations.stream_arn
+  function_name                  = aws_lambda_function.calendar_stream.arn
+  starting_position              = "LATEST"
+  batch_size                     = 100
+  maximum_retry_attempts         = 3
+  bisect_batch_on_function_error = true
+  function_response_types        = ["ReportBatchItemFailures"]
+
+  destination_config {
+    on_failure {
+      destination_arn = aws_sqs_queue.calendar_stream_failures.arn
+    }
+  }
+
+  depends_on = [aws_iam_role_policy.lambda_calendar_stream_failures]
 }
 
 # Lambda permission for Lex to invoke the function
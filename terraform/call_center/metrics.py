@@ -0,0 +1,129 @@
+"""
+Per-turn latency spans emitted as CloudWatch Embedded Metric Format (EMF).
+
+A turn collects span durations (validation, model call, tool execution,
+DynamoDB read, response build) and each model call's token counts and cost
+while it runs. When the handler returns, one EMF document with the Channel
+dimension is written to stdout, plus one document per tool with Channel and
+Tool dimensions. Repeated values are kept as arrays, so CloudWatch
+percentiles see every model call and read.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'CallCenter/RentalAgent')
+
+# Span names, used as metric names
+VALIDATION = 'Validation'
+MODEL_CALL = 'ModelCall'
+TOOL_EXECUTION = 'ToolExecution'
+DYNAMODB_READ = 'DynamoDBRead'
+RESPONSE_BUILD = 'ResponseBuild'
+TURN_TOTAL = 'TurnTotal'
+
+# Per model call values that are not durations, with their EMF units
+INPUT_TOKENS = 'InputTokens'
+OUTPUT_TOKENS = 'OutputTokens'
+MODEL_COST = 'ModelCostUSD'
+UNITS = {INPUT_TOKENS: 'Count', OUTPUT_TOKENS: 'Count', MODEL_COST: 'None'}
+
+
+def _emit_stdout(document):
+    sys.stdout.write(json.dumps(document, separators=(',', ':')) + '\n')
+    sys.stdout.flush()
+
+
+class MetricsRecorder:
+    """Collects span timings for the current turn and flushes them as EMF documents"""
+
+    def __init__(self, namespace=METRICS_NAMESPACE, enabled=METRICS_ENABLED, emit=_emit_stdout,
+                 clock=time.perf_counter, wall_clock=time.time):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.emit = emit
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, channel):
+        self.channel = channel
+        self.spans = {}
+        self.tool_spans = {}
+
+    def record(self, name, value, tool=None):
+        """Add one span duration in ms (or a value in its UNITS unit); tool spans are also reported per Tool"""
+        if not self.enabled or self.channel is None:
+            return
+        value = round(value, 6 if name == MODEL_COST else 2)
+        with self._lock:
+            self.spans.setdefault(name, []).append(value)
+            if tool:
+                self.tool_spans.setdefault(tool, []).append(value)
+
+    @contextlib.contextmanager
+    def span(self, name, tool=None):
+        """Time the enclosed block as one span of the current turn"""
+        started_at = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, (self.clock() - started_at) * 1000, tool)
+
+    def _document(self, dimensions, metrics, properties):
+        return {
+            '_aws': {
+                'Timestamp': int(self.wall_clock() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': UNITS.get(name, 'Milliseconds')} for name in metrics],
+                }],
+            },
+            **dimensions,
+            **metrics,
+            **properties,
+        }
+
+    def flush(self, request_id=None):
+        """Emit the current turn's documents and clear the turn; returns what was emitted"""
+        with self._lock:
+            channel, spans, tool_spans = self.channel, self.spans, self.tool_spans
+            self._reset(None)
+        if not self.enabled or channel is None or not spans:
+            return []
+
+        properties = {'RequestId': request_id} if request_id else {}
+        documents = [self._document({'Channel': channel}, spans, {**properties, 'Tools': sorted(tool_spans)})]
+        for tool, values in sorted(tool_spans.items()):
+            documents.append(self._document({'Channel': channel, 'Tool': tool}, {TOOL_EXECUTION: values}, properties))
+        for document in documents:
+            self.emit(document)
+        return documents
+
+    def record_turn(self, channel_of):
+        """Decorator that times a Lambda handler as one turn and flushes its metrics on return"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            def wrapper(event, context):
+                if not self.enabled:
+                    return handler(event, context)
+                with self._lock:
+                    self._reset(channel_of(event))
+                try:
+                    with self.span(TURN_TOTAL):
+                        return handler(event, context)
+                finally:
+                    self.flush(getattr(context, 'aws_request_id', None))
+            return wrapper
+        return decorator
+
+
+metrics = MetricsRecorder()
@@ -0,0 +1,133 @@
+"""
+Routes each model turn to a fast, small model or the larger default model.
+
+Short, simple turns (greetings, thanks, goodbyes, one price or description
+question) go to the fast model. Turns that mention dates, availability or
+bookings, longer turns and follow-ups such as "yes, book it" go to the large
+model. A fast-model reply is escalated to the large model when it asks for a
+tool or function call or looks unsure (empty, cut off at max_tokens, or
+hedging), so lookups and bookings always run on the large model.
+
+A call running low on its token budget prefers the fast model for every
+turn that does not need a lookup (reason "budget").
+
+Per-route overrides map a route or reason name to a model ID, e.g.
+"price=anthropic.claude-3-5-haiku-20241022-v1:0,large=anthropic.claude-3-5-sonnet-20241022-v2:0".
+"""
+
+import re
+import threading
+from collections import namedtuple
+
+FAST = 'fast'
+LARGE = 'large'
+
+Route = namedtuple('Route', ['name', 'reason', 'model_id'])
+
+# Longest utterance, in words, still treated as a simple turn
+SIMPLE_MAX_WORDS = 12
+
+_PRICE = re.compile(r'\b(?:price|prices|cost|costs|how much|rate|rates)\b')
+_DESCRIBE = re.compile(r'\b(?:what is|what\'s|tell me about|describe|what comes with|include|includes)\b')
+# Anything that needs a lookup, a booking or reasoning over dates
+_NEEDS_LARGE = re.compile(
+    r'\b(?:available|availability|free|open|book|booking|reserve|reservation|cancel|change|deliver|delivery|'
+    r'date|dates|today|tonight|tomorrow|weekend|week|month|'
+    r'monday|tuesday|wednesday|thursday|friday|saturday|sunday|'
+    r'jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec|'
+    r'january|february|march|april|june|july|august|september|october|november|december)\b|\d'
+)
+_UNSURE = re.compile(
+    r"\b(?:i'?m not sure|i am not sure|i don'?t know|i do not know|i'?m unable to|not certain|"
+    r"i can'?t (?:tell|say|confirm|check))\b", re.IGNORECASE
+)
+
+
+def parse_overrides(spec):
+    """Parse 'route=model_id,reason=model_id' into a dict, ignoring blank or malformed entries"""
+    overrides = {}
+    for entry in (spec or '').split(','):
+        name, _, model_id = entry.partition('=')
+        if name.strip() and model_id.strip():
+            overrides[name.strip().lower()] = model_id.strip()
+    return overrides
+
+
+class ModelRouter:
+    """Chooses a model per turn and decides when a fast-model reply must be escalated"""
+
+    def __init__(self, default_model_id, fast_model_id=None, overrides=None, enabled=True):
+        self.default_model_id = default_model_id
+        self.fast_model_id = fast_model_id
+        self.overrides = overrides or {}
+        self.enabled = enabled and bool(fast_model_id)
+        self.routes = {}
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    def model_for(self, name, reason):
+        """Model for a route: a reason override, then a route override, then the route default"""
+        default = self.fast_model_id if name == FAST else self.default_model_id
+        return self.overrides.get(reason) or self.overrides.get(name) or default
+
+    def classify(self, text, intent, equipment_count, has_history):
+        """Return (route name, reason) for one caller utterance"""
+        text = ' '.join((text or '').lower().split())
+        if not self.enabled:
+            return LARGE, 'routing_disabled'
+        if intent.is_goodbye:
+            return FAST, 'goodbye'
+        if len(text.split()) > SIMPLE_MAX_WORDS:
+            return LARGE, 'long_turn'
+        if _NEEDS_LARGE.search(text):
+            return LARGE, 'needs_lookup'
+        if equipment_count <= 1 and _PRICE.search(text):
+            return FAST, 'price'
+        if equipment_count == 1 and _DESCRIBE.search(text):
+            return FAST, 'describe'
+        if 'greeting' in intent.categories and not equipment_count:
+            return FAST, 'greeting'
+        return LARGE, 'follow_up' if has_history else 'default'
+
+    def route(self, text, intent, equipment_count=0, has_history=False, prefer_fast=False):
+        """Pick the route and model for one turn; prefer_fast moves large turns that need no lookup to the fast model"""
+        name, reason = self.classify(text, intent, equipment_count, has_history)
+        if prefer_fast and self.enabled and name == LARGE and reason != 'needs_lookup':
+            name, reason = FAST, 'budget'
+        self._count(name)
+        return Route(name, reason, self.model_for(name, reason))
+
+    def escalate(self, reason):
+        """Return the large-model route replacing a fast-model reply that was not good enough"""
+        with self._lock:
+            self.escalations += 1
+        self._count(LARGE)
+        return Route(LARGE, f'escalated:{reason}', self.model_for(LARGE, 'escalated'))
+
+    def escalation_reason(self, message, directive_pattern=None):
+        """Return why a fast-model reply should go to the large model, or None if it can be used"""
+        text = (message.get('text') or '').strip()
+        if any(block.get('type') == 'tool_use' for block in message.get('content', [])):
+            return 'tool_use'
+        if directive_pattern is not None and directive_pattern.search(text):
+            return 'function_call'
+        if message.get('stop_reason') == 'max_tokens':
+            return 'truncated'
+        if not text:
+            return 'empty'
+        if _UNSURE.search(text):
+            return 'low_confidence'
+        return None
+
+    def _count(self, name):
+        with self._lock:
+            self.routes[name] = self.routes.get(name, 0) + 1
+
+    def stats(self):
+        """Return per-route turn counts and how many fast turns were escalated"""
+        fast_turns = self.routes.get(FAST, 0)
+        return {
+            'routes': dict(self.routes),
+            'escalations': self.escalations,
+            'escalation_rate': round(self.escalations / fast_turns, 3) if fast_turns else 0.0
+        }
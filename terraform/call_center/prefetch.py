@@ -0,0 +1,85 @@
+"""
+Speculative prefetch of availability data while the model generates.
+
+At the start of a model turn, the items the caller named are loaded in the
+background. When the model later asks for one of them, the lookup waits on
+the in-flight load instead of issuing its own query, so DynamoDB latency
+overlaps with model latency. Items whose data is still cached from an earlier
+turn are skipped. Counters report how often the guess was used.
+"""
+
+import threading
+
+
+class AvailabilityPrefetcher:
+    """Runs speculative loads per key for one turn and lets lookups claim them"""
+
+    def __init__(self, executor, load, is_cached=None):
+        self.executor = executor
+        self.load = load
+        self.is_cached = is_cached or (lambda key: False)
+        self.hits = 0
+        self.misses = 0
+        self.unused = 0
+        self.skipped = 0
+        self._active = False
+        self._pending = {}
+        self._cached = set()
+        self._claimed = {}
+        self._lock = threading.Lock()
+
+    def start(self, keys):
+        """Begin a turn, submitting a background load for each key that is not already cached"""
+        keys = list(dict.fromkeys(keys))
+        cached = {key for key in keys if self.is_cached(key)}
+        with self._lock:
+            self._active = True
+            self._claimed = {}
+            self._cached = cached
+            self.skipped += len(cached)
+            self._pending = {key: self.executor.submit(self.load, key) for key in keys if key not in cached}
+
+    def claim(self, key):
+        """
+        Wait for this turn's prefetch of key, if there is one, and return True on a hit.
+
+        Lookups outside a turn, and of keys skipped because they were cached,
+        are not counted. A failed prefetch is treated as a hit that produced
+        nothing; the caller falls through to its own lookup.
+        """
+        with self._lock:
+            if not self._active or key in self._cached:
+                return False
+            future = self._claimed.get(key)
+            if future is None:
+                future = self._pending.pop(key, None)
+                if future is None:
+                    self.misses += 1
+                    return False
+                self._claimed[key] = future
+                self.hits += 1
+        try:
+            future.result()
+        except Exception:
+            pass
+        return True
+
+    def finish(self):
+        """End the turn; loads that were never claimed count as unused"""
+        with self._lock:
+            self.unused += len(self._pending)
+            self._pending = {}
+            self._claimed = {}
+            self._cached = set()
+            self._active = False
+
+    def stats(self):
+        """Return hit/miss/unused/skipped counters and the share of lookups served by a prefetch"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'unused': self.unused,
+            'skipped': self.skipped,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Replays recorded call transcripts against lambda_function.py and diffs them with golden outputs.
+
+Each transcript (replay/transcripts/*.json) is one call: the Lex events in
+order, the date it was recorded on and the reservations that existed then.
+Session attributes returned by each turn (conversation_history, failure_count)
+are threaded into the next event the way Lex does. Conversations are replayed
+concurrently by worker processes against the local DynamoDB stand-in and
+local_stubs.scripted_model, with the handler's clock pinned to the recording
+date so relative dates ("next Saturday") resolve the same way on every run.
+
+Every turn's response, fulfillment state, failure count, model calls and
+tool calls are compared with replay/golden/<conversation_id>.json. The run
+also reports conversational efficiency: turns per booking, model calls per
+turn and tokens per call.
+
+Run with: python replay/replay_transcripts.py [--workers N] [--update-golden]
+"""
+
+import argparse
+import difflib
+import glob
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time
+
+REPLAY_DIR = os.path.dirname(os.path.abspath(__file__))
+CALL_CENTER_DIR = os.path.join(REPLAY_DIR, '..')
+sys.path.insert(0, CALL_CENTER_DIR)
+
+TRANSCRIPTS_GLOB = os.path.join(REPLAY_DIR, 'transcripts', '*.json')
+GOLDEN_DIR = os.path.join(REPLAY_DIR, 'golden')
+
+# Fields compared with the golden output; token counts are reported but not diffed
+GOLDEN_FIELDS = ('utterance', 'response', 'state', 'failure_count', 'model_calls', 'tool_calls')
+BOOKING_TOOL = 'create_reservation'
+_DIRECTIVE = re.compile(r'\b(CHECK_AVAILABILITY(?:_ANY)?|FREE_DATES|CREATE_RESERVATION):(\S+)')
+
+
+def load_transcripts(pattern=TRANSCRIPTS_GLOB):
+    transcripts = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as transcript_file:
+            transcripts.append(json.load(transcript_file))
+    return transcripts
+
+
+def tool_calls(requests):
+    """Tool calls asked for by the model replies in requests, as 'name {arguments}' strings"""
+    calls = []
+    for request in requests:
+        for block in request.get('content', []):
+            if block['type'] == 'tool_use':
+                calls.append(f"{block['name']} {json.dumps(block['input'], sort_keys=True)}")
+            else:
+                calls.extend(f'{name.lower()} {arguments}' for name, arguments in _DIRECTIVE.findall(block['text']))
+    return calls
+
+
+def replay_conversation(handler, bedrock, transcript):
+    """Run one transcript's events through handler, threading session attributes between turns"""
+    attributes = {}
+    turns = []
+    for event in transcript['events']:
+        event = json.loads(json.dumps(event))
+        session_state = event.setdefault('sessionState', {})
+        session_state.setdefault('intent', {'name': 'RentalQueryIntent', 'slots': {}})
+        session_state['sessionAttributes'] = dict(attributes)
+
+        first_request = len(bedrock.requests)
+        response = handler(event, None)
+        requests = bedrock.requests[first_request:]
+
+        # Lex keeps the previous attributes when a response does not return any
+        attributes = response.get('sessionState', {}).get('sessionAttributes', attributes)
+        turns.append({
+            'utterance': event.get('inputTranscript', ''),
+            'response': response['messages'][0]['content'],
+            'state': response['sessionState']['intent']['state'],
+            'failure_count': int(attributes.get('failure_count', '0')),
+            'model_calls': len(requests),
+            'tool_calls': tool_calls(requests),
+            'input_tokens': sum(request['usage']['input_tokens'] for request in requests),
+            'output_tokens': sum(request['usage']['output_tokens'] for request in requests),
+        })
+
+    booked_at = next((number for number, turn in enumerate(turns, 1)
+                      if any(call.startswith(BOOKING_TOOL) for call in turn['tool_calls'])), None)
+    return {'conversation_id': transcript['conversation_id'], 'turns': turns, 'booked_at': booked_at}
+
+
+def pin_today(module, today):
+    """Make module's datetime.utcnow() return noon on today"""
+    class RecordedDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return cls.combine(today, time(12))
+    module.datetime = RecordedDatetime
+
+
+def replay_batch(transcripts, environment):
+    """Worker process: replay transcripts one after another, each against fresh tables"""
+    os.environ.update(environment)
+
+    import aws_clients
+    import lambda_function
+    from local_stubs import FakeBedrockRuntime, LocalDynamoDBResource, reservations_table, scripted_model
+
+    results = []
+    for transcript in transcripts:
+        today = date.fromisoformat(transcript['recorded_on'])
+        pin_today(lambda_function, today)
+        bedrock = FakeBedrockRuntime(scripted_model(lambda_function.EQUIPMENT_CATALOG, today))
+        aws_clients.set_client('dynamodb', LocalDynamoDBResource(reservations_table(transcript.get('reservations', []))))
+        aws_clients.set_client('bedrock-runtime', bedrock)
+        lambda_function.invalidate_availability_cache()
+        results.append(replay_conversation(lambda_function.lambda_handler, bedrock, transcript))
+    return results
+
+
+def replay_all(transcripts, workers, environment):
+    shards = [transcripts[worker::workers] for worker in range(workers)]
+    shards = [shard for shard in shards if shard]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        batches = list(executor.map(replay_batch, shards, [environment] * len(shards)))
+    by_id = {result['conversation_id']: result for batch in batches for result in batch}
+    return [by_id[transcript['conversation_id']] for transcript in transcripts]
+
+
+def golden_view(result):
+    return {'conversation_id': result['conversation_id'],
+            'turns': [{field: turn[field] for field in GOLDEN_FIELDS} for turn in result['turns']]}
+
+
+def golden_diff(result, golden):
+    """Unified diff between the golden output and this replay (empty when they match)"""
+    expected = json.dumps(golden, indent=2, sort_keys=True).splitlines()
+    actual = json.dumps(golden_view(result), indent=2, sort_keys=True).splitlines()
+    return list(difflib.unified_diff(expected, actual, 'golden', 'replay', lineterm=''))
+
+
+def efficiency(results):
+    """Turns per booking, model calls per turn and tokens per call over all replayed conversations"""
+    turns = [turn for result in results for turn in result['turns']]
+    booked = [result['booked_at'] for result in results if result['booked_at']]
+    tokens = [sum(turn['input_tokens'] + turn['output_tokens'] for turn in result['turns']) for result in results]
+    return {
+        'conversations': len(results),
+        'turns': len(turns),
+        'bookings': len(booked),
+        'turns_per_booking': round(statistics.mean(booked), 2) if booked else None,
+        'model_calls_per_turn': round(sum(turn['model_calls'] for turn in turns) / len(turns), 2) if turns else 0.0,
+        'tokens_per_call': round(statistics.mean(tokens), 1) if tokens else 0.0,
+        'input_tokens': sum(turn['input_tokens'] for turn in turns),
+        'output_tokens': sum(turn['output_tokens'] for turn in turns),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='conversations replayed concurrently')
+    parser.add_argument('--transcripts', default=TRANSCRIPTS_GLOB, help='glob of transcript files')
+    parser.add_argument('--tool-mode', default='native', choices=('native', 'directive'))
+    parser.add_argument('--update-golden', action='store_true', help='rewrite golden outputs from this replay')
+    parser.add_argument('--json', metavar='PATH', help='write every turn and the efficiency summary as JSON')
+    args = parser.parse_args()
+
+    environment = {
+        'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-west-2'),
+        'TOOL_MODE': args.tool_mode,
+        'RESPONSE_CACHE_ENABLED': 'false',
+        'METRICS_ENABLED': 'false',
+        'LOG_LEVEL': 'WARNING',
+    }
+    transcripts = load_transcripts(args.transcripts)
+    results = replay_all(transcripts, max(1, args.workers), environment)
+
+    failures = 0
+    for result in results:
+        golden_path = os.path.join(GOLDEN_DIR, f"{result['conversation_id']}.json")
+        if args.update_golden:
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            with open(golden_path, 'w') as golden_file:
+                json.dump(golden_view(result), golden_file, indent=2)
+                golden_file.write('\n')
+            print(f"{'UPDATED':<8} {result['conversation_id']}")
+            continue
+        if not os.path.exists(golden_path):
+            failures += 1
+            print(f"{'MISSING':<8} {result['conversation_id']} (run with --update-golden)")
+            continue
+        with open(golden_path) as golden_file:
+            diff = golden_diff(result, json.load(golden_file))
+        failures += bool(diff)
+        print(f"{'DIFF' if diff else 'OK':<8} {result['conversation_id']}")
+        for line in diff:
+            print(f"    {line}")
+
+    summary = efficiency(results)
+    print(f"\n{summary['conversations']} conversations, {summary['turns']} turns, {summary['bookings']} bookings")
+    print(f"{'turns per booking':<24} {summary['turns_per_booking']}")
+    print(f"{'model calls per turn':<24} {summary['model_calls_per_turn']}")
+    print(f"{'tokens per call':<24} {summary['tokens_per_call']} "
+          f"({summary['input_tokens']} input / {summary['output_tokens']} output in total)")
+
+    if args.json:
+        with open(args.json, 'w') as report_file:
+            json.dump({'summary': summary, 'conversations': results}, report_file, indent=2)
+    if failures:
+        print(f"\n{failures} conversation(s) differ from their golden output")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""
+Per-equipment occupancy calendar kept in sync with the reservations table.
+
+Each item's calendar is one DynamoDB item (hauliday_equipment_calendar): an
+epoch date plus a byte array holding the number of active reservations on
+each day from the epoch onwards. Days past the end of the array are free, so
+an availability check is one GetItem and a slice test, and "which days are
+free this month" is a single pass over at most 31 bytes.
+
+Calendars are maintained from the reservations table's DynamoDB stream
+(calendar_stream_handler.py) and can be rebuilt from a full scan. Each
+calendar remembers the stream sequence numbers it has applied, so a record
+delivered again by a retried batch is not counted twice.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+from availability import parse_date
+
+CALENDAR_HASH_KEY = 'equipment_id'
+# Days kept before today when a calendar is rewritten; older days are dropped
+CALENDAR_RETENTION_DAYS = 7
+_MAX_COUNT = 255
+# Stream sequence numbers remembered per calendar. DynamoDB Streams orders them only within a
+# shard and one item's reservations arrive on many shards, so the most recent ones are kept
+# rather than a single high-water mark.
+APPLIED_SEQUENCE_NUMBERS = 500
+
+# One change to an item's calendar; sequence_number is the stream record it came from, if any
+CalendarChange = namedtuple('CalendarChange', ['start', 'end', 'delta', 'sequence_number'], defaults=(None,))
+
+
+class CalendarConflict(Exception):
+    """Raised when a calendar changed between read and conditional write"""
+
+
+class OccupancyCalendar:
+    """Per-day reservation counts for one item, starting at epoch"""
+
+    def __init__(self, epoch, counts=b'', version=0, applied=()):
+        self.epoch = epoch
+        self.counts = bytearray(counts)
+        self.version = version
+        self.applied = list(applied)
+
+    def _index(self, day):
+        return (day - self.epoch).days
+
+    def covers(self, day):
+        """True if the calendar can answer for this day (days before the epoch were dropped)"""
+        return day >= self.epoch
+
+    def add(self, start, end, delta=1):
+        """Add delta reservations to every day in [start, end]; days before the epoch are ignored"""
+        first, last = max(self._index(start), 0), self._index(end)
+        if last < first:
+            return
+        if last >= len(self.counts):
+            self.counts.extend(bytes(last + 1 - len(self.counts)))
+        for index in range(first, last + 1):
+            self.counts[index] = max(0, min(_MAX_COUNT, self.counts[index] + delta))
+
+    def is_free(self, start, end):
+        """True if no day in [start, end] has an active reservation"""
+        first, last = max(self._index(start), 0), min(self._index(end), len(self.counts) - 1)
+        return last < first or not any(self.counts[first:last + 1])
+
+    def reserved_count(self, day):
+        index = self._index(day)
+        return self.counts[index] if 0 <= index < len(self.counts) else 0
+
+    def free_days(self, start, end):
+        """Return every free day in [start, end]"""
+        days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+        return [day for day in days if not self.reserved_count(day)]
+
+    def mark_applied(self, sequence_numbers):
+        """Remember stream records as applied, keeping the most recent APPLIED_SEQUENCE_NUMBERS"""
+        applied = set(self.applied).union(sequence_numbers)
+        self.applied = sorted(applied, key=int)[-APPLIED_SEQUENCE_NUMBERS:]
+
+    def roll(self, epoch):
+        """Move the epoch forward, dropping the days before it"""
+        if epoch > self.epoch:
+            del self.counts[:self._index(epoch)]
+            self.epoch = epoch
+
+    def to_item(self, equipment_id):
+        # Trailing free days carry no information
+        return {
+            CALENDAR_HASH_KEY: equipment_id,
+            'epoch': self.epoch.isoformat(),
+            'occupancy': bytes(self.counts.rstrip(b'\x00')),
+            'version': self.version,
+            'applied': list(self.applied),
+        }
+
+    @classmethod
+    def from_item(cls, item):
+        occupancy = item.get('occupancy', b'')
+        # boto3 returns Binary attributes wrapped in boto3.dynamodb.types.Binary
+        occupancy = getattr(occupancy, 'value', occupancy)
+        return cls(date.fromisoformat(item['epoch']), bytes(occupancy), int(item.get('version', 0)),
+                   item.get('applied', ()))
+
+
+def reservation_days(item):
+    """Return (equipment_id, start, end) for an active reservation item, else None"""
+    if not item or item.get('status') == 'cancelled':
+        return None
+    try:
+        return item['equipment_id'], parse_date(item['start_date']), parse_date(item['end_date'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _plain_image(image):
+    """Flatten the string attributes of a stream image ({'S': ...}) into a dict"""
+    return {name: value['S'] for name, value in (image or {}).items() if 'S' in value}
+
+
+def stream_deltas(record):
+    """Return the (equipment_id, start, end, delta) changes implied by one stream record"""
+    images = record.get('dynamodb', {})
+    old = reservation_days(_plain_image(images.get('OldImage')))
+    new = reservation_days(_plain_image(images.get('NewImage')))
+    if old == new:
+        return []
+    deltas = []
+    if old:
+        deltas.append((*old, -1))
+    if new:
+        deltas.append((*new, 1))
+    return deltas
+
+
+def load_calendar(table, equipment_id):
+    """Fetch one item's calendar, or None if it has never been written"""
+    item = table.get_item(Key={CALENDAR_HASH_KEY: equipment_id}).get('Item')
+    return OccupancyCalendar.from_item(item) if item else None
+
+
+def save_calendar(table, equipment_id, calendar, expected_version):
+    """Write a calendar if nobody else wrote it since it was read (expected_version None means new)"""
+    item = calendar.to_item(equipment_id)
+    item['version'] = (expected_version or 0) + 1
+    if expected_version is None:
+        condition = {'ConditionExpression': f'attribute_not_exists({CALENDAR_HASH_KEY})'}
+    else:
+        condition = {'ConditionExpression': 'version = :version',
+                     'ExpressionAttributeValues': {':version': expected_version}}
+    try:
+        table.put_item(Item=item, **condition)
+    except Exception as error:
+        if getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            raise CalendarConflict(equipment_id) from error
+        raise
+    calendar.version = item['version']
+
+
+def apply_deltas(table, equipment_id, deltas, today, attempts=5):
+    """
+    Apply (start, end, delta[, sequence_number]) changes to one item's calendar with optimistic concurrency.
+
+    Changes from stream records the calendar has already applied are skipped,
+    and the calendar is not written at all when nothing is left.
+    """
+    epoch = today - timedelta(days=CALENDAR_RETENTION_DAYS)
+    changes = [CalendarChange(*change) for change in deltas]
+    for _ in range(attempts):
+        calendar = load_calendar(table, equipment_id)
+        expected_version = calendar.version if calendar else None
+        calendar = calendar or OccupancyCalendar(epoch)
+        applied = set(calendar.applied)
+        pending = [change for change in changes if change.sequence_number not in applied]
+        if not pending:
+            return calendar
+        calendar.roll(epoch)
+        for change in pending:
+            calendar.add(change.start, change.end, change.delta)
+        calendar.mark_applied(change.sequence_number for change in pending if change.sequence_number)
+        try:
+            save_calendar(table, equipment_id, calendar, expected_version)
+            return calendar
+        except CalendarConflict:
+            continue
+    raise CalendarConflict(equipment_id)
+
+
+def rebuild_calendars(reservations_table, calendar_table, today, equipment_ids=()):
+    """
+    Recompute calendars from a full scan of the reservations table and return the IDs written.
+
+    equipment_ids are written even when they have no active reservations, which
+    clears calendars whose reservations were all cancelled.
+    """
+    epoch = today - timedelta(days=CALENDAR_RETENTION_DAYS)
+    calendars = {equipment_id: OccupancyCalendar(epoch) for equipment_id in equipment_ids}
+    scan_kwargs = {}
+    while True:
+        response = reservations_table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            days = reservation_days(item)
+            if days:
+                equipment_id, start, end = days
+                calendars.setdefault(equipment_id, OccupancyCalendar(epoch)).add(start, end)
+        if not response.get('LastEvaluatedKey'):
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    for equipment_id, calendar in calendars.items():
+        existing = load_calendar(calendar_table, equipment_id)
+        if existing:
+            # Records applied before the rebuild are part of the scan; a retry must not add them again
+            calendar.applied = existing.applied
+        save_calendar(calendar_table, equipment_id, calendar, existing.version if existing else None)
+    return sorted(calendars)
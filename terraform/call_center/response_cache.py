@@ -0,0 +1,106 @@
+"""
+Response cache for repeated caller questions, persisted in SQLite.
+
+Entries are keyed on the normalized utterance plus the equipment and date
+entities it mentions, expire after a TTL, and answers that depend on
+reservation data are dropped whenever the reservation table changes. In
+Lambda the database lives under /tmp, so it survives warm invocations.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from date_parser import parse_spoken_dates
+
+_FILLER_WORDS = frozenset([
+    'um', 'uh', 'uhm', 'er', 'hmm', 'like', 'so', 'well', 'please', 'hi', 'hello', 'hey',
+    'yeah', 'ok', 'okay', 'just', 'actually', 'basically',
+])
+_PUNCTUATION = re.compile(r"[^\w\s'-]")
+
+
+def normalize_utterance(text):
+    """Lowercase, strip punctuation and filler words, and collapse whitespace"""
+    words = _PUNCTUATION.sub(' ', (text or '').lower()).split()
+    return ' '.join(word for word in words if word not in _FILLER_WORDS)
+
+
+def extract_date_entities(text, today):
+    """
+    Return the dates mentioned in the utterance as resolved "start/end" ISO ranges.
+
+    Resolving against today means "tomorrow" asked on a different day
+    produces a different key.
+    """
+    return [f'{start.isoformat()}/{end.isoformat()}' for start, end, _ in parse_spoken_dates(text, today)]
+
+
+def cache_key(normalized_text, equipment_ids, date_entities):
+    """Build a stable key from the normalized text and its entities"""
+    material = json.dumps([normalized_text, sorted(equipment_ids), date_entities], separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class SQLiteResponseCache:
+    """TTL response cache stored in a local SQLite database"""
+
+    def __init__(self, path, ttl_seconds=900, clock=time.time):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' response TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' availability_dependent INTEGER NOT NULL)'
+        )
+
+    def get(self, key):
+        """Return the cached response for key, or None if missing or expired"""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT response FROM responses WHERE key = ? AND expires_at > ?', (key, self.clock())
+            ).fetchone()
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, response, availability_dependent=False, ttl_seconds=None):
+        """Store a response; availability-dependent entries are dropped on reservation changes"""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            now = self.clock()
+            self._connection.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses (key, response, expires_at, availability_dependent) VALUES (?, ?, ?, ?)',
+                (key, response, now + ttl_seconds, int(availability_dependent))
+            )
+
+    def invalidate_availability(self):
+        """Drop every entry whose answer depended on reservation data"""
+        with self._lock:
+            self._connection.execute('DELETE FROM responses WHERE availability_dependent = 1')
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+
+    def stats(self):
+        """Return hit/miss counters suitable for logging"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
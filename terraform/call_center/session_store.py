@@ -0,0 +1,54 @@
+"""
+Conversation state for Amazon Connect calls, keyed by ContactId.
+
+Lex keeps history in session attributes, but direct Connect invocations have
+nowhere to carry it between turns. Each contact's history is stored as one
+DynamoDB item: the compressed history from conversation_history.pack_history
+plus the call's token usage (token_usage.TokenUsage.to_attribute) and an
+expires_at epoch used as the table's TTL attribute. A turn costs one
+GetItem and one PutItem. Expired items are ignored on read because DynamoDB
+deletes them lazily.
+"""
+
+import time
+
+from conversation_history import pack_history, unpack_history
+
+SESSION_HASH_KEY = 'contact_id'
+
+
+class DynamoDBSessionStore:
+    """Loads and saves per-contact conversation history with TTL expiry"""
+
+    def __init__(self, table, ttl_seconds=3600, clock=time.time):
+        # table is a callable returning the boto3 Table, so the client is only built when first used
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+    def load_session(self, contact_id):
+        """Return (summary, messages, token usage attribute) for a contact; empty if none is stored or it expired"""
+        item = self.table().get_item(Key={SESSION_HASH_KEY: contact_id}, ConsistentRead=True).get('Item')
+        if not item or int(item.get('expires_at', 0)) <= self.clock():
+            return '', [], None
+        history = item['history']
+        # boto3 returns Binary attributes wrapped in boto3.dynamodb.types.Binary
+        summary, messages = unpack_history(bytes(getattr(history, 'value', history)))
+        return summary, messages, item.get('token_usage')
+
+    def load(self, contact_id):
+        """Return (summary, messages) for a contact; empty history if none is stored or it expired"""
+        return self.load_session(contact_id)[:2]
+
+    def save(self, contact_id, summary, messages, token_usage=None):
+        """Store a contact's history and push its expiry ttl_seconds into the future; returns the stored size"""
+        history = pack_history(summary, messages)
+        item = {
+            SESSION_HASH_KEY: contact_id,
+            'history': history,
+            'expires_at': int(self.clock()) + self.ttl_seconds,
+        }
+        if token_usage:
+            item['token_usage'] = token_usage
+        self.table().put_item(Item=item)
+        return len(history)
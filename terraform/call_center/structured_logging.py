@@ -0,0 +1,101 @@
+"""
+Structured, sampled logging for the rental Lambda.
+
+Each invocation starts with start_request(), which decides whether the
+request is verbose: a LOG_SAMPLE_RATE fraction of requests is, and so is any
+session whose attributes carry debug_logging=true. Verbose requests log at
+DEBUG (full redacted events, cache and history stats); everything else logs
+at LOG_LEVEL, where disabled calls return before any message is formatted.
+
+In Lambda, records are written as one JSON object per line with the request
+ID, any fields passed through log_fields(), and emails and phone numbers
+masked.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+
+LOG_LEVEL = getattr(logging, os.environ.get('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '0.01'))
+DEBUG_SESSION_ATTRIBUTE = 'debug_logging'
+
+REDACTED = '[REDACTED]'
+PII_KEYS = frozenset(['name', 'email', 'phone', 'phone_number', 'customer_name', 'address'])
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+_PHONE = re.compile(r'(?<!\d)(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?!\d)')
+
+# Per-container request state; Lambda runs one invocation at a time per container
+_request = {'request_id': None, 'verbose': False}
+
+
+def redact_text(text):
+    """Mask emails and phone numbers in free text"""
+    return _PHONE.sub(REDACTED, _EMAIL.sub(REDACTED, text))
+
+
+def redact(value):
+    """Return a copy of a JSON-like value with PII keys and PII-looking strings masked"""
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in PII_KEYS else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return redact_text(value)
+    return value
+
+
+def log_fields(**fields):
+    """Build the extra= argument that attaches structured fields to a record"""
+    return {'extra': {'fields': fields}}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON with the current request ID and redacted fields"""
+
+    def format(self, record):
+        entry = {'level': record.levelname, 'message': redact_text(record.getMessage())}
+        if _request['request_id']:
+            entry['request_id'] = _request['request_id']
+        entry.update(redact(getattr(record, 'fields', {})))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Set the base level, quiet the AWS SDK loggers and install the JSON formatter in Lambda"""
+    logger = logging.getLogger()
+    logger.setLevel(LOG_LEVEL)
+    # Verbose requests lower the root level; SDK wire logs would swamp them
+    for name in ('boto3', 'botocore', 'urllib3'):
+        logging.getLogger(name).setLevel(max(LOG_LEVEL, logging.WARNING))
+    if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        for handler in logger.handlers:
+            handler.setFormatter(JsonFormatter())
+    return logger
+
+
+def _debug_requested(event):
+    attributes = (event.get('sessionState', {}).get('sessionAttributes')
+                  or event.get('Details', {}).get('ContactData', {}).get('Attributes')
+                  or {})
+    return str(attributes.get(DEBUG_SESSION_ATTRIBUTE, '')).lower() == 'true'
+
+
+def start_request(event, context, sample=random.random):
+    """Record the request ID and decide whether this request logs verbosely"""
+    verbose = _debug_requested(event) or sample() < LOG_SAMPLE_RATE
+    _request['request_id'] = getattr(context, 'aws_request_id', None)
+    _request['verbose'] = verbose
+    logger = logging.getLogger()
+    level = logging.DEBUG if verbose else LOG_LEVEL
+    if logger.level != level:
+        logger.setLevel(level)
+    return verbose
+
+
+def is_verbose():
+    return _request['verbose']
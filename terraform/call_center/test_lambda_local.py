@@ -0,0 +1,954 @@
+#!/usr/bin/env python3
+"""
+Local tests for the rental Lambda that run against the stand-ins in local_stubs.py.
+
+Run with: python -m pytest -q test_lambda_local.py
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from availability import find_conflict, load_intervals, overlaps, parse_date, query_reservations
+from bedrock_resilience import BedrockGuard
+from bedrock_streaming import DIRECTIVE_PATTERN, read_stream
+from conversation_history import append_turn, build_model_messages, encode_history, load_history
+from date_parser import DateRange, booking_window_error, parse_spoken_dates
+from intent_matcher import is_goodbye, is_rental_message, match_intents
+from local_stubs import FakeBedrockRuntime, LocalDynamoDBResource, calendar_table, reservations_table, sessions_table
+from reservation_calendar import CalendarConflict, apply_deltas, load_calendar, rebuild_calendars, save_calendar
+from response_cache import SQLiteResponseCache, normalize_utterance
+from token_usage import BudgetPlan, TokenAccountant, TokenBudget, TokenUsage
+from tools import ToolRegistry
+from ttl_cache import TTLCache
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+
+def reservation(reservation_id, equipment_id, start_date, end_date, status='confirmed'):
+    return {
+        'reservation_id': reservation_id,
+        'equipment_id': equipment_id,
+        'start_date': start_date,
+        'end_date': end_date,
+        'status': status
+    }
+
+
+SAMPLE_RESERVATIONS = [
+    reservation('r1', 'cotton-candy', '2025-07-01', '2025-07-03'),
+    reservation('r2', 'cotton-candy', '2025-07-10', '2025-07-12'),
+    reservation('r3', 'cotton-candy', '2025-07-20', '2025-07-20', status='cancelled'),
+    reservation('r4', 'snow-cone', '2025-07-20', '2025-07-22'),
+    reservation('r5', 'cotton-candy', '2025-08-01T09:00:00', '2025-08-02T17:00:00'),
+]
+
+
+@pytest.fixture
+def lambda_module(monkeypatch):
+    pytest.importorskip('boto3')
+    import aws_clients
+    import lambda_function
+    table = reservations_table(SAMPLE_RESERVATIONS, page_size=1)
+    monkeypatch.setattr(aws_clients, '_clients', {'dynamodb': LocalDynamoDBResource(table)})
+    monkeypatch.setattr(lambda_function, 'response_cache', SQLiteResponseCache(':memory:'))
+    monkeypatch.setattr(lambda_function, 'bedrock_guard', BedrockGuard(lambda_function.model_executor))
+    lambda_function.invalidate_availability_cache()
+    return lambda_function
+
+
+def use_bedrock(fake):
+    import aws_clients
+    aws_clients.set_client('bedrock-runtime', fake)
+
+
+def days_from_today(days):
+    return (datetime.utcnow().date() + timedelta(days=days)).isoformat()
+
+
+def test_overlaps_is_inclusive():
+    assert overlaps(date(2025, 7, 1), date(2025, 7, 3), date(2025, 7, 3), date(2025, 7, 5))
+    assert not overlaps(date(2025, 7, 1), date(2025, 7, 3), date(2025, 7, 4), date(2025, 7, 5))
+
+
+def test_parse_date_accepts_datetimes():
+    assert parse_date('2025-08-01T09:00:00') == date(2025, 8, 1)
+
+
+def test_query_follows_pagination():
+    table = reservations_table(SAMPLE_RESERVATIONS, page_size=1)
+    items = query_reservations(table, 'cotton-candy')
+    assert sorted(item['reservation_id'] for item in items) == ['r1', 'r2', 'r5']
+    assert len([call for call in table.calls if call[0] == 'query']) > 1
+
+
+def test_query_bounds_by_date_window():
+    table = reservations_table(SAMPLE_RESERVATIONS)
+    items = query_reservations(table, 'cotton-candy', '2025-07-11', '2025-08-01')
+    assert sorted(item['reservation_id'] for item in items) == ['r2', 'r5']
+    assert not [call for call in table.calls if call[0] == 'scan']
+
+
+def test_find_conflict():
+    intervals = load_intervals(SAMPLE_RESERVATIONS[:2])
+    assert find_conflict(intervals, date(2025, 7, 4), date(2025, 7, 9)) is None
+    assert find_conflict(intervals, date(2025, 7, 9), date(2025, 7, 10))[2] == 'r2'
+
+
+def test_get_equipment_availability(lambda_module):
+    assert lambda_module.get_equipment_availability('cotton-candy', '2025-07-04', '2025-07-09')
+    assert not lambda_module.get_equipment_availability('cotton-candy', '2025-07-12', '2025-07-14')
+    assert lambda_module.get_equipment_availability('cotton-candy', '2025-07-20', '2025-07-20')
+    assert not lambda_module.get_equipment_availability('cotton-candy', '2025-08-02', '2025-08-02')
+
+
+def stream_record(old=None, new=None, sequence_number=None):
+    images = {'OldImage': old, 'NewImage': new}
+    record = {'dynamodb': {name: {key: {'S': value} for key, value in item.items()}
+                           for name, item in images.items() if item}}
+    if sequence_number:
+        record['dynamodb']['SequenceNumber'] = sequence_number
+    return record
+
+
+def test_calendar_follows_the_reservation_stream():
+    from calendar_stream_handler import group_deltas
+    table = calendar_table()
+    booked = reservation('c1', 'single-kayak', '2025-07-10', '2025-07-12')
+    records = [
+        stream_record(new=booked),
+        stream_record(new=reservation('c2', 'single-kayak', '2025-07-12', '2025-07-13')),
+        stream_record(old=booked, new={**booked, 'status': 'cancelled'}),
+    ]
+    for equipment_id, deltas in group_deltas(records).items():
+        apply_deltas(table, equipment_id, deltas, today=date(2025, 7, 1))
+
+    calendar = load_calendar(table, 'single-kayak')
+    assert calendar.is_free(date(2025, 7, 10), date(2025, 7, 11))
+    assert not calendar.is_free(date(2025, 7, 11), date(2025, 7, 12))
+    assert calendar.free_days(date(2025, 7, 11), date(2025, 7, 15)) == [
+        date(2025, 7, 11), date(2025, 7, 14), date(2025, 7, 15)]
+
+    apply_deltas(table, 'single-kayak', [(date(2025, 7, 20), date(2025, 7, 20), 1)], today=date(2025, 7, 1))
+    with pytest.raises(CalendarConflict):
+        save_calendar(table, 'single-kayak', calendar, calendar.version)
+
+    written = rebuild_calendars(reservations_table(SAMPLE_RESERVATIONS), table, date(2025, 7, 1), ['single-kayak'])
+    assert written == ['cotton-candy', 'single-kayak', 'snow-cone']
+    assert load_calendar(table, 'single-kayak').counts == b''
+
+
+def test_retried_stream_batches_apply_each_record_once(monkeypatch):
+    import aws_clients
+    import calendar_stream_handler
+    table = calendar_table()
+    monkeypatch.setattr(aws_clients, '_clients', {'dynamodb': LocalDynamoDBResource(table)})
+    start = days_from_today(10)
+    records = [
+        stream_record(new=reservation('s1', 'single-kayak', start, start), sequence_number='100'),
+        stream_record(new=reservation('s2', 'snow-cone', start, start), sequence_number='200'),
+        stream_record(new=reservation('s3', 'single-kayak', days_from_today(12), days_from_today(12)),
+                      sequence_number='300'),
+    ]
+
+    put_item = table.put_item
+    def failing_put_item(Item, **kwargs):
+        if Item['equipment_id'] == 'snow-cone':
+            raise RuntimeError('throttled')
+        return put_item(Item=Item, **kwargs)
+    monkeypatch.setattr(table, 'put_item', failing_put_item)
+    assert calendar_stream_handler.lambda_handler({'Records': records}, None) == {
+        'batchItemFailures': [{'itemIdentifier': '200'}]}
+
+    # Lambda retries from the failed record; the kayak's records are not counted again
+    monkeypatch.setattr(table, 'put_item', put_item)
+    assert calendar_stream_handler.lambda_handler({'Records': records}, None) == {'batchItemFailures': []}
+    kayak, snow_cone = load_calendar(table, 'single-kayak'), load_calendar(table, 'snow-cone')
+    assert kayak.reserved_count(date.fromisoformat(start)) == 1
+    assert kayak.reserved_count(date.fromisoformat(days_from_today(12))) == 1
+    assert snow_cone.reserved_count(date.fromisoformat(start)) == 1
+    assert kayak.applied == ['100', '300'] and snow_cone.applied == ['200']
+
+
+def test_calendar_source_answers_with_one_get_item(lambda_module, monkeypatch):
+    import aws_clients
+    reservations = reservations_table([reservation('c3', 'paddleboard', days_from_today(5), days_from_today(6))])
+    calendars = calendar_table()
+    rebuild_calendars(reservations, calendars, datetime.utcnow().date())
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(reservations, calendars))
+    monkeypatch.setattr(lambda_module, 'AVAILABILITY_SOURCE', 'calendar')
+    reservations.calls.clear()
+    calendars.calls.clear()
+
+    assert lambda_module.get_equipment_availability('paddleboard', days_from_today(3), days_from_today(4))
+    assert not lambda_module.get_equipment_availability('paddleboard', days_from_today(4), days_from_today(5))
+    assert calendars.calls == [('get_item', {'equipment_id': 'paddleboard'})]
+    assert not reservations.calls
+
+
+def test_free_dates_are_found_with_one_query_per_item_and_read_compactly(lambda_module, monkeypatch):
+    import aws_clients
+    start = date.fromisoformat(days_from_today(40)).replace(day=1)
+    end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    table = reservations_table([
+        reservation('m1', 'tandem-kayak', start.isoformat(), (start + timedelta(days=1)).isoformat()),
+        reservation('m2', 'tandem-kayak', (start + timedelta(days=9)).isoformat(), (start + timedelta(days=18)).isoformat()),
+        reservation('m3', 'single-kayak', start.isoformat(), end.isoformat()),
+    ])
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(table))
+    use_bedrock(FakeBedrockRuntime(f"FREE_DATES:tandem-kayak+single-kayak,{start},{end}"))
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'directive')
+
+    response = lambda_module.lambda_handler(lex_event('What days are the kayaks free next month?'), None)
+    assert response['messages'][0]['content'] == (
+        f"In {start:%B}, the Tandem Kayak is free the 3rd through the 9th and from the 20th on. "
+        f"The Single Kayak is booked the whole time. Which dates would you like to reserve?")
+    assert len([call for call in table.calls if call[0] == 'query']) == 2
+
+    ranges = [(date(2025, 7, 30), date(2025, 7, 31)), (date(2025, 8, 4), date(2025, 8, 8)), (date(2025, 8, 12), date(2025, 8, 12))]
+    assert lambda_module.compress_free_ranges(ranges, date(2025, 7, 28), date(2025, 8, 20)) == (
+        "July 30th and the 31st, August 4th through the 8th and on the 12th")
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # evicts b, the least recently used
+    assert cache.get('b') is None
+    now[0] = 11.0
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_repeated_checks_hit_the_availability_cache(lambda_module):
+    table = lambda_module.get_dynamodb().Table(lambda_module.TABLE_NAME)
+    table.put_item(Item=reservation('f1', 'tandem-kayak', days_from_today(10), days_from_today(12)))
+
+    assert lambda_module.get_equipment_availability('tandem-kayak', days_from_today(3), days_from_today(4))
+    queries = len(table.calls)
+    assert not lambda_module.get_equipment_availability('tandem-kayak', days_from_today(11), days_from_today(11))
+    assert len(table.calls) == queries
+    assert lambda_module.availability_cache.stats()['hits'] >= 1
+
+    table.put_item(Item=reservation('f2', 'tandem-kayak', days_from_today(3), days_from_today(3)))
+    lambda_module.invalidate_availability_cache('tandem-kayak')
+    assert not lambda_module.get_equipment_availability('tandem-kayak', days_from_today(3), days_from_today(4))
+
+
+def test_check_availability_any_summarizes_every_item(lambda_module):
+    table = lambda_module.get_dynamodb().Table(lambda_module.TABLE_NAME)
+    table.put_item(Item=reservation('f3', 'snow-cone', days_from_today(5), days_from_today(6)))
+
+    availability = lambda_module.get_batch_availability(days_from_today(5), days_from_today(5))
+    assert set(availability) == set(lambda_module.EQUIPMENT_CATALOG)
+    assert availability['snow-cone'] is False
+    assert availability['cotton-candy'] is True
+
+    reply = lambda_module.process_function_calls(f"CHECK_AVAILABILITY_ANY:{days_from_today(5)},{days_from_today(5)}")
+    assert 'Cotton Candy Machine ($40/day)' in reply
+    assert 'Snow Cone Machine' not in reply
+
+    # A space after the comma is accepted, and every range in the reply is answered
+    reply = lambda_module.process_function_calls(f"CHECK_AVAILABILITY_ANY:{days_from_today(5)}, {days_from_today(5)} "
+                                                 f"CHECK_AVAILABILITY_ANY:{days_from_today(8)}, {days_from_today(8)}")
+    assert 'CHECK_AVAILABILITY_ANY' not in reply
+    assert f'From {days_from_today(5)} to {days_from_today(5)}, these are available' in reply
+    assert f'Everything is available from {days_from_today(8)} to {days_from_today(8)}' in reply
+
+
+def test_stream_stops_once_directive_is_complete():
+    reply = "CHECK_AVAILABILITY:cotton-candy,2030-07-20,2030-07-21 and then a long explanation " * 5
+    client = FakeBedrockRuntime(reply, chunk_size=4)
+    response = client.invoke_model_with_response_stream(body='{}', modelId='test')
+
+    result = read_stream(response, stop_pattern=DIRECTIVE_PATTERN)
+    assert result['stopped_early']
+    assert result['text'].startswith('CHECK_AVAILABILITY:cotton-candy,2030-07-20,2030-07-21')
+    assert len(result['text']) < len(reply)
+    assert response['body'].closed
+    assert result['time_to_first_token_ms'] is not None
+    # The output count arrives after the directive, so it is estimated from what was streamed
+    assert result['usage'] == {'input_tokens': client.requests[0]['usage']['input_tokens'],
+                               'output_tokens': len(result['text']) // 4}
+
+
+def test_streamed_reply_runs_function_calls(lambda_module, monkeypatch):
+    start = days_from_today(5)
+    monkeypatch.setattr(lambda_module, 'BEDROCK_STREAMING', True)
+    use_bedrock(FakeBedrockRuntime(f"CHECK_AVAILABILITY:single-kayak,{start},{start} trailing text"))
+    lambda_module.token_accountant.start_turn()
+    reply = lambda_module.handle_rental_query('Is the single kayak free?', [])
+    assert reply.startswith('Great news! The Single Kayak is available')
+    assert lambda_module.token_accountant.turn.output_tokens > 0
+
+
+def test_several_directives_are_checked_concurrently(lambda_module, monkeypatch):
+    import aws_clients
+    start = days_from_today(6)
+    table = reservations_table([reservation('f5', 'paddleboard', start, start)], latency=0.1)
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(table))
+    monkeypatch.setattr(lambda_module, 'BEDROCK_STREAMING', True)
+    use_bedrock(FakeBedrockRuntime(
+        f"CHECK_AVAILABILITY:single-kayak,{start},{start}\n"
+        f"CHECK_AVAILABILITY:paddleboard,{start},{start}\n"
+        f"CHECK_AVAILABILITY:tandem-kayak,{start},{start}\nLet me know if you need anything else.", chunk_size=6
+    ))
+
+    started_at = time.perf_counter()
+    reply = lambda_module.handle_rental_query('Are the kayaks and paddleboard free?', [])
+    assert time.perf_counter() - started_at < 0.25
+    assert reply == (f"From {start} to {start}, the Single Kayak ($25/day) and Tandem Kayak ($35/day) are available, "
+                     f"but the Stand-Up Paddleboard (SUP) is booked. Would you like to make a reservation?")
+    assert len([call for call in table.calls if call[0] == 'query']) == 3
+
+
+def test_named_items_are_prefetched_while_the_model_generates(lambda_module, monkeypatch):
+    import aws_clients
+    start = days_from_today(9)
+    table = reservations_table([reservation('f6', 'snow-cone', start, start)], latency=0.15)
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(table))
+    use_bedrock(FakeBedrockRuntime(f"CHECK_AVAILABILITY:snow-cone,{start},{start}", latency=0.15))
+    hits = lambda_module.prefetcher.hits
+
+    started_at = time.perf_counter()
+    response = lambda_module.lambda_handler(lex_event('Is the snow cone machine available that Saturday?'), None)
+    assert time.perf_counter() - started_at < 0.28
+    assert response['messages'][0]['content'].startswith('Sorry, the Snow Cone Machine is not available')
+    assert lambda_module.prefetcher.hits == hits + 1
+    assert len([call for call in table.calls if call[0] == 'query']) == 1
+
+
+def test_prefetch_skips_items_already_in_the_availability_cache(lambda_module):
+    import aws_clients
+    start = days_from_today(9)
+    table = reservations_table([reservation('f7', 'snow-cone', start, start)])
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(table))
+    use_bedrock(FakeBedrockRuntime(f"CHECK_AVAILABILITY:snow-cone,{start},{start}"))
+    lambda_module.load_equipment_window('snow-cone')
+    skipped, misses = lambda_module.prefetcher.skipped, lambda_module.prefetcher.misses
+
+    response = lambda_module.lambda_handler(lex_event('Is the snow cone machine available that Saturday?'), None)
+    assert response['messages'][0]['content'].startswith('Sorry, the Snow Cone Machine is not available')
+    assert lambda_module.prefetcher.skipped == skipped + 1
+    assert lambda_module.prefetcher.misses == misses
+    assert len([call for call in table.calls if call[0] == 'query']) == 1
+
+
+def test_system_prompt_is_static_and_dated_per_request(lambda_module):
+    assert str(datetime.utcnow().year) not in lambda_module.SYSTEM_PROMPT
+
+    blocks = lambda_module.build_system_prompt('anthropic.claude-3-sonnet-20240229-v1:0', today=date(2031, 3, 4))
+    assert blocks[0]['text'] == lambda_module.SYSTEM_PROMPT
+    assert 'cache_control' not in blocks[0]
+    assert '2031-03-04' in blocks[1]['text']
+
+    blocks = lambda_module.build_system_prompt('us.anthropic.claude-3-7-sonnet-20250219-v1:0')
+    assert blocks[0]['cache_control'] == {'type': 'ephemeral'}
+    assert 'cache_control' not in blocks[1]
+
+
+def test_tool_registry_validates_arguments():
+    registry = ToolRegistry()
+
+    @registry.register('echo', 'Echo a date', {'day': {'type': 'string', 'format': 'date'}}, required=('day',))
+    def echo(day):
+        return {'day': day}
+
+    assert registry.call('echo', {'day': '2030-01-02'}) == ('{"day": "2030-01-02"}', False)
+    assert registry.call('echo', {'day': 'July 4th'})[1] is True
+    assert registry.call('echo', {})[1] is True
+    assert registry.call('echo', {'day': '2030-02-30'})[1] is True
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_native_tool_loop_runs_tools_in_parallel(lambda_module, monkeypatch, streaming):
+    start = days_from_today(6)
+    table = lambda_module.get_dynamodb().Table(lambda_module.TABLE_NAME)
+    table.put_item(Item=reservation('f4', 'paddleboard', start, start))
+
+    def responder(payload, model_id):
+        last = payload['messages'][-1]['content']
+        if isinstance(last, str):
+            return [
+                {'type': 'text', 'text': 'Let me check.'},
+                {'type': 'tool_use', 'name': 'check_availability',
+                 'input': {'equipment_id': 'single-kayak', 'start_date': start, 'end_date': start}},
+                {'type': 'tool_use', 'name': 'check_availability',
+                 'input': {'equipment_id': 'paddleboard', 'start_date': start, 'end_date': start}},
+            ]
+        results = {result['tool_use_id']: result for result in last}
+        assert len(results) == 2
+        assert not any(result.get('is_error') for result in results.values())
+        return 'The Single Kayak is available but the paddleboard is booked.'
+
+    fake = FakeBedrockRuntime(responder)
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'native')
+    monkeypatch.setattr(lambda_module, 'BEDROCK_STREAMING', streaming)
+    use_bedrock(fake)
+
+    reply = lambda_module.handle_rental_query('Are the single kayak and paddleboard free?', [])
+    assert reply == 'The Single Kayak is available but the paddleboard is booked.'
+    assert len(fake.requests) == 2
+    assert {tool['name'] for tool in fake.requests[0]['payload']['tools']} == {
+        'check_availability', 'check_availability_any', 'find_free_dates', 'create_reservation'}
+
+
+def lex_event(text, session_attributes=None):
+    return {
+        'inputTranscript': text,
+        'sessionState': {
+            'intent': {'name': 'RentalQueryIntent', 'slots': {}},
+            'sessionAttributes': session_attributes or {}
+        }
+    }
+
+
+def test_history_is_trimmed_by_budget_and_round_trips():
+    summary, messages = '', []
+    for turn in range(12):
+        summary, messages = append_turn(summary, messages, f'Question {turn} about the cotton candy machine?',
+                                        f'Answer {turn}: it is $40 per day. ' * 3, token_budget=200)
+
+    assert messages[0]['role'] == 'user'
+    assert messages[-1]['content'].startswith('Answer 11')
+    assert 'Question' in summary
+    assert sum(len(message['content']) for message in messages) // 4 <= 200
+
+    attributes, stats = encode_history(summary, messages)
+    assert stats['stored_bytes'] < stats['raw_bytes']
+    assert 'conversation_history_z' in attributes
+    assert load_history(attributes) == (summary, messages)
+    assert build_model_messages(summary, messages)[0]['content'].startswith('[Earlier in this call:')
+
+
+def test_legacy_history_attribute_is_still_read():
+    legacy = {'conversation_history': '[{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]'}
+    assert load_history(legacy) == ('', [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}])
+
+
+def test_lambda_handler_threads_history_through_session(lambda_module, monkeypatch):
+    fake = FakeBedrockRuntime(lambda payload, model_id: f"Reply {len(payload['messages'])}")
+    use_bedrock(fake)
+
+    attributes = {}
+    for question in ['How much is the snow cone machine?', 'What about the castle bounce house?']:
+        response = lambda_module.lambda_handler(lex_event(question, attributes), None)
+        attributes = response['sessionState']['sessionAttributes']
+
+    assert fake.requests[-1]['payload']['messages'][0]['content'] == 'How much is the snow cone machine?'
+    assert len(load_history(attributes)[1]) == 4
+
+
+def test_simple_turns_use_the_fast_model_and_escalate_on_tool_use(lambda_module, monkeypatch):
+    from model_router import ModelRouter, parse_overrides
+    router = ModelRouter('large-model', 'fast-model', parse_overrides('greeting=greeting-model, bad-entry'))
+    monkeypatch.setattr(lambda_module, 'model_router', router)
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'directive')
+
+    def responder(payload, model_id):
+        if 'kayak' in payload['messages'][-1]['content'] and model_id == 'fast-model':
+            return "CHECK_AVAILABILITY:single-kayak,"
+        return f"answered by {model_id}"
+
+    fake = FakeBedrockRuntime(responder)
+    use_bedrock(fake)
+    assert lambda_module.handle_rental_query('Hi there, thanks for picking up', []) == 'answered by greeting-model'
+    assert lambda_module.handle_rental_query('How much is the single kayak?', []) == 'answered by large-model'
+    assert lambda_module.handle_rental_query('Is the cotton candy machine free on the 20th?', []) == 'answered by large-model'
+    assert [request['model_id'] for request in fake.requests] == [
+        'greeting-model', 'fast-model', 'large-model', 'large-model']
+    assert router.stats()['escalations'] == 1
+
+
+def test_handler_matches_intents_once_per_turn(lambda_module, monkeypatch):
+    use_bedrock(FakeBedrockRuntime('Happy to help.'))
+    matched = []
+    def counting_match_intents(message):
+        matched.append(message)
+        return match_intents(message)
+    monkeypatch.setattr(lambda_module, 'match_intents', counting_match_intents)
+
+    lambda_module.lambda_handler(lex_event('Hi, can you help me plan a party?'), None)
+    lambda_module.lambda_handler({'Details': {'Parameters': {'inputTranscript': 'Can you help me plan a party?'},
+                                              'ContactData': {}}}, None)
+    assert matched == ['Hi, can you help me plan a party?', 'Can you help me plan a party?']
+
+
+def test_token_budget_shrinks_replies_then_prefers_the_fast_model_then_stops():
+    budget = TokenBudget(10000, max_tokens=1000)
+    assert budget.plan(0) == BudgetPlan(1000, False, False)
+    assert budget.plan(6000) == BudgetPlan(800, False, False)
+    assert budget.plan(8500) == BudgetPlan(300, True, False)
+    assert budget.plan(9950) == BudgetPlan(50, True, False)
+    assert budget.plan(10000).exhausted
+    assert TokenBudget(0).plan(10 ** 9) == BudgetPlan(1000, False, False)
+
+
+def test_prompt_cache_tokens_are_priced_separately():
+    usage = TokenUsage()
+    input_tokens, output_tokens, cost = usage.add('anthropic.claude-3-haiku-20240307-v1:0', {
+        'input_tokens': 100, 'cache_read_input_tokens': 2000, 'cache_creation_input_tokens': 400, 'output_tokens': 50})
+    assert (input_tokens, output_tokens) == (2500, 50)
+    # Haiku: $0.00025 per 1K input, a tenth of that for cache reads, 1.25x for cache writes, $0.00125 per 1K output
+    assert cost == pytest.approx((100 * 0.00025 + 2000 * 0.000025 + 400 * 0.0003125 + 50 * 0.00125) / 1000)
+    assert usage.total_tokens == 100 + 200 + 500 + 50
+
+    restored = TokenUsage.from_attribute(usage.to_attribute())
+    assert (restored.cache_read_tokens, restored.cache_write_tokens) == (2000, 400)
+    assert restored.total_tokens == usage.total_tokens
+
+
+def test_token_usage_is_accumulated_per_call_and_enforced(lambda_module, monkeypatch):
+    fake = FakeBedrockRuntime('Happy to help. Which bounce house did you have in mind?')
+    use_bedrock(fake)
+    monkeypatch.setattr(lambda_module, 'token_accountant', TokenAccountant(TokenBudget(0)))
+
+    first = lambda_module.lambda_handler(lex_event('What sizes do the bounce houses come in'), None)
+    attributes = first['sessionState']['sessionAttributes']
+    usage = TokenUsage.from_attribute(attributes['token_usage'])
+    assert usage.model_calls == 1 and usage.input_tokens == fake.requests[0]['usage']['input_tokens']
+    assert usage.cost_usd > 0 and fake.requests[0]['payload']['max_tokens'] == 1000
+
+    # With under a fifth of the budget left, replies are shorter and follow-ups go to the fast model
+    budget = TokenBudget(int(usage.total_tokens * 1.1), max_tokens=1000)
+    monkeypatch.setattr(lambda_module, 'token_accountant', TokenAccountant(budget))
+    second = lambda_module.lambda_handler(lex_event('Which one would you recommend for a party', attributes), None)
+    attributes = second['sessionState']['sessionAttributes']
+    assert fake.requests[1]['model_id'] == lambda_module.FAST_MODEL_ID
+    assert 150 <= fake.requests[1]['payload']['max_tokens'] < 1000
+    assert TokenUsage.from_attribute(attributes['token_usage']).model_calls == 2
+
+    # Once it is spent the caller is answered without the model
+    third = lambda_module.lambda_handler(lex_event('Thanks, one more bounce house question', attributes), None)
+    assert third['messages'][0]['content'] == lambda_module.BUDGET_EXHAUSTED_MESSAGE
+    assert len(fake.requests) == 2
+
+    # A failed turn keeps the call's usage, since Lex replaces the session attributes with the response's
+    def failing_respond(*args):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(lambda_module, 'respond_to_query', failing_respond)
+    failed = lambda_module.lambda_handler(lex_event('Is the castle bounce house big', attributes), None)
+    assert failed['sessionState']['intent']['state'] == 'Failed'
+    assert failed['sessionState']['sessionAttributes']['token_usage'] == attributes['token_usage']
+
+
+def test_spent_budget_skips_the_availability_prefetch(lambda_module, monkeypatch):
+    fake = FakeBedrockRuntime('model reply')
+    use_bedrock(fake)
+    table = lambda_module.get_dynamodb().Table(lambda_module.TABLE_NAME)
+    accountant = TokenAccountant(TokenBudget(100))
+    accountant.start_turn(TokenUsage(input_tokens=100))
+    monkeypatch.setattr(lambda_module, 'token_accountant', accountant)
+    table.calls.clear()
+
+    reply = lambda_module.handle_with_prefetch(f'Is the snow cone machine available {days_from_today(9)}?', [])
+    assert reply == lambda_module.BUDGET_EXHAUSTED_MESSAGE
+    assert not fake.requests and not table.calls
+
+
+class FakeContext:
+    aws_request_id = 'local-request'
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def test_slow_model_falls_back_before_the_deadline_and_opens_the_circuit(lambda_module, monkeypatch):
+    guard = BedrockGuard(lambda_module.model_executor, reserve_ms=1000, hedge_enabled=False, failure_threshold=2)
+    monkeypatch.setattr(lambda_module, 'bedrock_guard', guard)
+    fake = FakeBedrockRuntime('Too late', latency=0.5)
+    use_bedrock(fake)
+
+    for _ in range(2):
+        started_at = time.perf_counter()
+        response = lambda_module.lambda_handler(lex_event('Can I rent a kayak for my trip?'), FakeContext(1200))
+        assert time.perf_counter() - started_at < 0.4
+        assert response['messages'][0]['contentType'] == 'SSML'
+        assert 'Thanks for holding' in response['messages'][0]['content']
+
+    response = lambda_module.lambda_handler(lex_event('Can I rent a kayak for my trip?'), FakeContext(30000))
+    assert 'Thanks for holding' in response['messages'][0]['content']
+    assert len(fake.requests) == 2
+    assert guard.stats()['short_circuits'] == 1
+    assert guard.stats()['open_circuits'] == [lambda_module.MODEL_ID]
+
+    # Connect speaks response_text as plain text, so it gets the answer without SSML
+    response = lambda_module.lambda_handler({'Details': {'Parameters': {'inputTranscript': 'Can I rent a kayak?'},
+                                                         'ContactData': {}}}, FakeContext(30000))
+    assert response['response_text'] == lambda_module.MODEL_UNAVAILABLE_TEXT
+
+
+def test_only_transient_model_errors_open_the_circuit():
+    from botocore.exceptions import ClientError
+    from concurrent.futures import ThreadPoolExecutor
+    guard = BedrockGuard(ThreadPoolExecutor(max_workers=2), hedge_enabled=False, failure_threshold=2)
+
+    def failing(code, status):
+        def request(cancelled):
+            raise ClientError({'Error': {'Code': code, 'Message': code},
+                               'ResponseMetadata': {'HTTPStatusCode': status}}, 'InvokeModel')
+        return request
+
+    for _ in range(3):
+        with pytest.raises(ClientError):
+            guard.call('model', failing('ValidationException', 400))
+    assert guard.breaker('model').state == 'closed'
+
+    for code, status in (('ThrottlingException', 429), ('InternalServerException', 500)):
+        with pytest.raises(ClientError):
+            guard.call('model', failing(code, status))
+    assert guard.stats()['open_circuits'] == ['model']
+
+
+def test_slow_model_call_is_hedged(lambda_module, monkeypatch):
+    guard = BedrockGuard(lambda_module.model_executor, hedge_after_ms=50)
+    monkeypatch.setattr(lambda_module, 'bedrock_guard', guard)
+
+    def responder(payload, model_id):
+        if len(fake.requests) == 1:
+            time.sleep(0.4)
+        return 'Hedged reply'
+
+    fake = FakeBedrockRuntime(responder)
+    use_bedrock(fake)
+    lambda_module.token_accountant.start_turn()
+    started_at = time.perf_counter()
+    assert lambda_module.handle_rental_query('Can I rent a kayak for my trip?', []) == 'Hedged reply'
+    assert time.perf_counter() - started_at < 0.3
+    assert guard.stats()['hedges'] == 1 and guard.stats()['hedge_wins'] == 1
+
+    # The slow primary was billed too, so its usage joins the turn once it completes
+    time.sleep(0.5)
+    assert lambda_module.token_accountant.turn.model_calls == 2
+
+
+def test_losing_calls_are_cancelled_and_their_usage_kept():
+    from concurrent.futures import ThreadPoolExecutor
+    from local_stubs import FakeEventStream
+    executor = ThreadPoolExecutor(max_workers=1)
+    guard = BedrockGuard(executor, hedge_after_ms=50, hedge_min_ms=50)
+    sent = []
+
+    def request(cancelled):
+        sent.append(cancelled)
+        time.sleep(0.2)
+        return 'first reply'
+
+    # The hedge is still queued behind the primary when the primary wins, so it is never sent
+    assert guard.call('model', request) == 'first reply'
+    executor.shutdown(wait=True)
+    assert len(sent) == 1 and guard.stats()['hedges'] == 1 and guard.stats()['cancelled'] == 1
+
+    # A running loser still completes; its reply goes to on_discard
+    guard = BedrockGuard(ThreadPoolExecutor(max_workers=2), hedge_after_ms=50, hedge_min_ms=50)
+    discarded = []
+    replies = iter(('slow primary', 'hedge'))
+
+    def racing(cancelled):
+        reply = next(replies)
+        time.sleep(0.3 if reply == 'slow primary' else 0.0)
+        return reply
+
+    assert guard.call('model', racing, on_discard=discarded.append) == 'hedge'
+    time.sleep(0.35)
+    assert discarded == ['slow primary']
+
+    # A streamed reply whose call was given up stops reading and closes its body
+    body = FakeEventStream([{'type': 'message_start', 'message': {'usage': {'input_tokens': 40}}},
+                            {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}},
+                            {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': 'abcd'}}])
+    cancelled = threading.Event()
+    cancelled.set()
+    result = read_stream({'body': body}, cancelled=cancelled)
+    assert body.closed and body.consumed == 1 and result['text'] == '' and 'output_tokens' in result['usage']
+
+
+def connect_event(text, contact_id='contact-1'):
+    return {'Details': {'Parameters': {'inputTranscript': text}, 'ContactData': {'ContactId': contact_id}}}
+
+
+def test_connect_turns_share_history_through_the_session_store(lambda_module, monkeypatch):
+    import aws_clients
+    sessions = sessions_table()
+    aws_clients.set_client('dynamodb', LocalDynamoDBResource(reservations_table(), sessions))
+    fake = FakeBedrockRuntime(lambda payload, model_id: f"Reply {len(payload['messages'])}")
+    use_bedrock(fake)
+
+    lambda_module.lambda_handler(connect_event('I need a kayak rental for a lake trip'), None)
+    response = lambda_module.lambda_handler(connect_event('Make it the tandem kayak please'), None)
+    assert response == {'response_text': 'Reply 3'}
+    assert [message['content'] for message in fake.requests[1]['payload']['messages']] == [
+        'I need a kayak rental for a lake trip', 'Reply 1', 'Make it the tandem kayak please']
+    assert [call[0] for call in sessions.calls] == ['get_item', 'put_item', 'get_item', 'put_item']
+    assert isinstance(sessions.items[0]['history'], bytes)
+    assert TokenUsage.from_attribute(sessions.items[0]['token_usage']).model_calls == 2
+
+    # Expired sessions start over even before DynamoDB's TTL deletes them
+    monkeypatch.setattr(lambda_module.session_store, 'clock', lambda: time.time() + 2 * lambda_module.SESSION_TTL_SECONDS)
+    lambda_module.lambda_handler(connect_event('Make it the tandem kayak please'), None)
+    assert len(fake.requests[2]['payload']['messages']) == 1
+
+
+def test_intent_matcher_categories_and_goodbyes():
+    intent = match_intents('Can I book the water slide for Saturday?')
+    assert {'equipment', 'rental_term', 'inquiry'} <= intent.categories
+    assert 'water slide' in intent.keywords and 'slide' in intent.keywords
+    assert not intent.is_goodbye
+
+    assert is_rental_message('hello there')
+    assert not is_rental_message('Write me a poem')
+    assert not is_rental_message('   ')
+
+    for phrase in ['bye', 'no', 'Nope', 'ok bye', "that's all thanks", 'no thank you']:
+        assert is_goodbye(phrase), phrase
+    for phrase in ['byebye', 'no I want the kayak', 'nobody', 'is the kayak available']:
+        assert not is_goodbye(phrase), phrase
+
+
+def test_fast_path_answers_catalog_questions_without_bedrock(lambda_module, monkeypatch):
+    fake = FakeBedrockRuntime('model reply')
+    use_bedrock(fake)
+
+    reply = lambda_module.respond_to_query('How much does the cotton candy machine cost?', [])
+    assert reply.startswith('The Cotton Candy Machine is $40 per day')
+    assert 'Tandem Kayak at $35 a day' in lambda_module.respond_to_query('What equipment do you have available?', [])
+    assert not fake.requests
+
+    spoken = date.fromisoformat(days_from_today(10))
+    question = f'Is the cotton candy machine available {spoken:%B} {spoken.day}th, {spoken.year}?'
+    assert lambda_module.respond_to_query(question, []) == 'model reply'
+    assert lambda_module.respond_to_query('How much is it?', []) == 'model reply'
+    assert len(fake.requests) == 2
+    assert lambda_module.fast_path.stats()['hits'] >= 2
+
+
+def test_spoken_dates_resolve_against_the_current_year():
+    today = date(2026, 10, 14)  # a Wednesday
+    assert parse_spoken_dates('Is the kayak free November 30th?', today) == [
+        DateRange(date(2026, 11, 30), date(2026, 11, 30), 'november 30th')]
+    # A date without a year that has already passed means next year; an explicit year is kept
+    assert parse_spoken_dates('Is the kayak free August 30th?', today)[0][:2] == (date(2027, 8, 30), date(2027, 8, 30))
+    assert parse_spoken_dates('January 4th', date(2026, 12, 28))[0][:2] == (date(2027, 1, 4), date(2027, 1, 4))
+    assert parse_spoken_dates('1/4', date(2026, 12, 28))[0][:2] == (date(2027, 1, 4), date(2027, 1, 4))
+    assert parse_spoken_dates('August 30th, 2026', today)[0][:2] == (date(2026, 8, 30), date(2026, 8, 30))
+    assert parse_spoken_dates('next weekend', today)[0][:2] == (date(2026, 10, 24), date(2026, 10, 25))
+    assert parse_spoken_dates('this weekend', today)[0][:2] == (date(2026, 10, 17), date(2026, 10, 18))
+    assert parse_spoken_dates('the 4th through the 6th', today)[0][:2] == (date(2026, 11, 4), date(2026, 11, 6))
+    assert parse_spoken_dates('from December 30th to January 2nd', today)[0][:2] == (date(2026, 12, 30), date(2027, 1, 2))
+    assert parse_spoken_dates('between 11/3 and the twentieth of november', today)[0][:2] == (
+        date(2026, 11, 3), date(2026, 11, 20))
+    assert parse_spoken_dates('is this the first time you rent 24/7', today) == []
+
+    assert booking_window_error(date(2026, 8, 30), date(2026, 8, 30), today) == 'past'
+    assert booking_window_error(date(2026, 10, 15), date(2026, 10, 16), today) == 'too_soon'
+    assert booking_window_error(date(2026, 10, 16), date(2026, 10, 16), today) is None
+
+
+def test_dates_inside_the_booking_window_are_rejected_before_any_call(lambda_module):
+    fake = FakeBedrockRuntime('model reply')
+    use_bedrock(fake)
+    table = lambda_module.get_dynamodb().Table(lambda_module.TABLE_NAME)
+
+    reply = lambda_module.respond_to_query('Can I rent the single kayak tomorrow?', [])
+    assert reply.startswith("We can't book same-day or next-day rentals")
+    assert lambda_module.process_function_calls(
+        f'CHECK_AVAILABILITY:single-kayak,{days_from_today(1)},{days_from_today(1)}').startswith("We can't book")
+    assert not fake.requests
+    assert not [call for call in table.calls if call[0] == 'query']
+
+    content, is_error = lambda_module.TOOL_REGISTRY.call(
+        'check_availability', {'equipment_id': 'single-kayak', 'start_date': days_from_today(0), 'end_date': days_from_today(0)})
+    assert is_error and 'at least 2 days' in content
+
+
+def test_response_cache_ttl_and_availability_invalidation():
+    now = [1000.0]
+    cache = SQLiteResponseCache(':memory:', ttl_seconds=60, clock=lambda: now[0])
+    cache.put('static', 'We rent kayaks.')
+    cache.put('dated', 'The kayak is available.', availability_dependent=True)
+    assert cache.get('dated') == 'The kayak is available.'
+
+    cache.invalidate_availability()
+    assert cache.get('dated') is None
+    assert cache.get('static') == 'We rent kayaks.'
+
+    now[0] += 61
+    assert cache.get('static') is None
+    assert normalize_utterance('Um, is the KAYAK free?') == normalize_utterance('is the kayak free')
+
+
+def test_repeated_first_turn_questions_skip_the_model(lambda_module, monkeypatch):
+    fake = FakeBedrockRuntime('We deliver within ten miles.')
+    use_bedrock(fake)
+
+    assert lambda_module.respond_to_query('Do you deliver the castle bounce house?', []) == 'We deliver within ten miles.'
+    assert lambda_module.respond_to_query('um, do you deliver the castle bounce house', []) == 'We deliver within ten miles.'
+    assert len(fake.requests) == 1
+
+    history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+    lambda_module.respond_to_query('Do you deliver the castle bounce house?', history)
+    assert len(fake.requests) == 2
+
+
+def test_aws_clients_are_lazy_shared_and_tuned(monkeypatch):
+    pytest.importorskip('boto3')
+    import aws_clients
+    monkeypatch.setattr(aws_clients, '_clients', {})
+
+    client = aws_clients.get_bedrock_runtime()
+    assert aws_clients.get_bedrock_runtime() is client
+    assert client.meta.config.retries['mode'] == 'adaptive'
+    assert client.meta.config.connect_timeout == aws_clients.BEDROCK_CONNECT_TIMEOUT
+
+    aws_clients.set_client('bedrock-runtime', None)
+    assert aws_clients.get_bedrock_runtime() is not client
+
+
+def test_cold_start_profiler_reports_first_invocation_only():
+    from cold_start import ColdStartProfiler
+    profiler = ColdStartProfiler(enabled=True)
+    profiler.record('import', 0.25)
+    handler = profiler.profile_first_call(lambda event, context: 'ok')
+
+    assert handler({}, None) == 'ok'
+    assert handler({}, None) == 'ok'
+    phases = profiler.report()['cold_start_ms']
+    assert phases['import'] == 250.0
+    assert set(phases) == {'import', 'first_invocation'}
+    assert profiler.reported
+
+
+def test_structured_logging_samples_redacts_and_honors_debug_flag():
+    import logging
+    import structured_logging
+    from structured_logging import JsonFormatter, log_fields, start_request
+
+    root = logging.getLogger()
+    level = root.level
+    try:
+        assert not start_request(lex_event('hi', {}), None, sample=lambda: 0.99)
+        assert not root.isEnabledFor(logging.DEBUG)
+        assert start_request(lex_event('hi', {'debug_logging': 'true'}), None, sample=lambda: 0.99)
+        assert root.isEnabledFor(logging.DEBUG)
+        assert start_request(lex_event('hi', {}), None, sample=lambda: 0.0)
+    finally:
+        start_request(lex_event('hi', {}), None, sample=lambda: 0.99)
+        root.setLevel(level)
+
+    record = logging.LogRecord('root', logging.INFO, __file__, 1, 'User query: call me at %s', ('(503) 555-0142',), None)
+    record.__dict__.update(log_fields(event={'email': 'a@b.com', 'inputTranscript': 'mail jo@example.com'})['extra'])
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['message'] == f'User query: call me at {structured_logging.REDACTED}'
+    assert entry['event'] == {'email': '[REDACTED]', 'inputTranscript': 'mail [REDACTED]'}
+    assert structured_logging.redact_text('from 2025-08-30 to 2025-09-01') == 'from 2025-08-30 to 2025-09-01'
+
+
+def test_debug_flag_lasts_for_the_whole_lex_session(lambda_module, monkeypatch):
+    import structured_logging
+    use_bedrock(FakeBedrockRuntime('Which kayak would you like?'))
+    monkeypatch.setattr(structured_logging, 'LOG_SAMPLE_RATE', 0.0)
+    attributes = {'debug_logging': 'true'}
+    for utterance in ('Can I rent a kayak for my trip?', 'The single kayak please'):
+        response = lambda_module.lambda_handler(lex_event(utterance, attributes), None)
+        assert structured_logging._request['verbose']
+        attributes = response['sessionState']['sessionAttributes']
+        assert attributes['debug_logging'] == 'true'
+
+    # Error responses carry it too
+    monkeypatch.setattr(lambda_module, 'respond_to_query', lambda *args: 1 / 0)
+    failed = lambda_module.lambda_handler(lex_event('Is the kayak free?', attributes), None)
+    assert failed['sessionState']['sessionAttributes']['debug_logging'] == 'true'
+    empty = lambda_module.lambda_handler(lex_event('', attributes), None)
+    assert empty['sessionState']['sessionAttributes']['debug_logging'] == 'true'
+
+
+def test_turn_spans_are_emitted_as_emf(lambda_module, monkeypatch, capsys):
+    start = days_from_today(6)
+
+    def responder(payload, model_id):
+        if isinstance(payload['messages'][-1]['content'], str):
+            return [{'type': 'tool_use', 'name': 'check_availability',
+                     'input': {'equipment_id': 'single-kayak', 'start_date': start, 'end_date': start}}]
+        return 'The Single Kayak is available.'
+
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'native')
+    use_bedrock(FakeBedrockRuntime(responder))
+    capsys.readouterr()
+
+    lambda_module.lambda_handler(lex_event('Is the single kayak free next Saturday?'), None)
+    documents = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith('{"_aws"')]
+
+    turn, tool = documents
+    directive = turn['_aws']['CloudWatchMetrics'][0]
+    assert directive['Namespace'] == 'CallCenter/RentalAgent'
+    assert directive['Dimensions'] == [['Channel']]
+    assert {metric['Name']: metric['Unit'] for metric in directive['Metrics']} == {
+        'Validation': 'Milliseconds', 'ModelCall': 'Milliseconds', 'ToolExecution': 'Milliseconds',
+        'DynamoDBRead': 'Milliseconds', 'ResponseBuild': 'Milliseconds', 'TurnTotal': 'Milliseconds',
+        'InputTokens': 'Count', 'OutputTokens': 'Count', 'ModelCostUSD': 'None'}
+    assert turn['Channel'] == 'Lex' and turn['Tools'] == ['check_availability']
+    assert len(turn['ModelCall']) == 2 and all(value >= 0 for value in turn['TurnTotal'])
+    assert len(turn['InputTokens']) == 2 and all(value > 0 for value in turn['OutputTokens'])
+
+    assert tool['_aws']['CloudWatchMetrics'][0]['Dimensions'] == [['Channel', 'Tool']]
+    assert (tool['Channel'], tool['Tool']) == ('Lex', 'check_availability')
+    assert len(tool['ToolExecution']) == 1
+
+
+def test_system_suite_runs_in_parallel_against_the_local_backend(lambda_module, monkeypatch, tmp_path):
+    import xml.etree.ElementTree as ET
+    from test_system import FAILED, PASSED, WARNING, RentalSystemTester
+
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'native')
+    tester = RentalSystemTester(backend='local', workers=4)
+    assert tester.run_all_tests()
+    assert {result.status for result in tester.results} == {PASSED}
+    assert len(tester.results) == 13 and all(result.duration_ms >= 0 for result in tester.results)
+    assert tester.lambda_client.invocations.count('call-center-rental-query') == 6
+
+    tester.write_json(tmp_path / 'results.json')
+    tester.write_junit(tmp_path / 'results.xml')
+    assert json.loads((tmp_path / 'results.json').read_text())['summary'] == {
+        PASSED: 13, WARNING: 0, FAILED: 0, 'total': 13}
+    suites = ET.parse(tmp_path / 'results.xml').getroot()
+    assert [suite.get('name') for suite in suites] == ['Lambda', 'Lex', 'DynamoDB', 'Connect', 'End-to-End']
+    assert suites.get('tests') == '13' and suites.get('failures') == '0'
+
+
+def test_replay_threads_session_attributes_and_records_tool_calls(lambda_module, monkeypatch):
+    from local_stubs import scripted_model
+    from replay.replay_transcripts import efficiency, replay_conversation
+
+    monkeypatch.setattr(lambda_module, 'TOOL_MODE', 'native')
+    bedrock = FakeBedrockRuntime(scripted_model(lambda_module.EQUIPMENT_CATALOG))
+    use_bedrock(bedrock)
+    transcript = {'conversation_id': 'kayak', 'events': [
+        {'inputTranscript': ''},
+        {'inputTranscript': 'Is the single kayak available next Saturday?'},
+        {'inputTranscript': 'Please book it, my name is Sam Lee'},
+    ]}
+
+    result = replay_conversation(lambda_module.lambda_handler, bedrock, transcript)
+    silent, check, booking = result['turns']
+    assert (silent['failure_count'], silent['model_calls']) == (1, 0)
+    assert check['failure_count'] == 0 and check['tool_calls'][0].startswith('check_availability ')
+    assert booking['tool_calls'][0].startswith('create_reservation ') and '"name": "Sam Lee"' in booking['tool_calls'][0]
+    # The booking turn found the item and date in the history threaded through session attributes
+    assert 'single-kayak' in booking['tool_calls'][0]
+    assert result['booked_at'] == 3
+
+    summary = efficiency([result])
+    assert (summary['bookings'], summary['turns_per_booking']) == (1, 3)
+    assert summary['tokens_per_call'] == summary['input_tokens'] + summary['output_tokens'] > 0
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 """
 Comprehensive test suite for the Amazon Connect + Lex + Lambda rental system
+
+Cases run concurrently on a thread pool and are timed individually. The "aws"
+backend calls the deployed services; the "local" backend runs the same cases
+in-process against lambda_function.py and the fakes in local_stubs.py, so the
+suite needs no AWS access and finishes in seconds. Results can be written as
+JSON and JUnit XML for CI.
 """
 
+import argparse
 import json
 import boto3
 import sys
 import os
-from datetime import datetime
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import traceback
+import xml.etree.ElementTree as ET
 
 # Colors for output
 class Colors:
@@ -37,21 +48,103 @@ def print_warning(text):
 def print_info(text):
     print(f"{Colors.CYAN}ℹ️  {text}{Colors.NC}")
 
-class RentalSystemTester:
-    def __init__(self):
+PASSED = 'passed'
+WARNING = 'warning'
+FAILED = 'failed'
+
+_STATUS_SYMBOLS = {PASSED: '✅', WARNING: '⚠️ ', FAILED: '❌'}
+_STATUS_PRINTERS = {PASSED: print_success, WARNING: print_warning, FAILED: print_error}
+
+# One independent test case: run() returns (status, message, detail lines)
+Case = namedtuple('Case', ['suite', 'name', 'run'])
+CaseResult = namedtuple('CaseResult', ['suite', 'name', 'status', 'message', 'details', 'duration_ms'])
+
+
+def lex_payload(text):
+    return {
+        "inputTranscript": text,
+        "sessionState": {
+            "intent": {"name": "RentalQueryIntent", "slots": {}},
+            "sessionAttributes": {}
+        }
+    }
+
+
+class AwsBackend:
+    """boto3 clients for the deployed system"""
+
+    name = 'aws'
+
+    def __init__(self, tester):
         self.lambda_client = boto3.client('lambda')
         self.lex_client = boto3.client('lexv2-runtime')
         self.connect_client = boto3.client('connect')
         self.dynamodb = boto3.resource('dynamodb')
 
+
+class LocalBackend:
+    """
+    In-process fakes: lambda_function.py against the local DynamoDB tables and a
+    scripted Bedrock model, Lex NLU from the rental keyword matcher, and a
+    Connect instance with the configured bot alias associated
+    """
+
+    name = 'local'
+
+    def __init__(self, tester):
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+        os.environ.setdefault('RESPONSE_CACHE_ENABLED', 'false')
+        os.environ.setdefault('METRICS_ENABLED', 'false')
+        import aws_clients
+        import lambda_function
+        from intent_matcher import is_rental_message
+        from local_stubs import (FakeBedrockRuntime, LocalConnectClient, LocalDynamoDBResource, LocalLambdaClient,
+                                 LocalLexRuntime, LocalTable, calendar_table, reservations_table, scripted_model,
+                                 sessions_table)
+
+        today = datetime.utcnow().date()
+        reservations = reservations_table([
+            {'reservation_id': 'local-1', 'equipment_id': 'cotton-candy', 'status': 'confirmed',
+             'start_date': (today + timedelta(days=10)).isoformat(),
+             'end_date': (today + timedelta(days=11)).isoformat()},
+        ])
+        if tester.dynamodb_table_name != reservations.name:
+            reservations = LocalTable(tester.dynamodb_table_name, reservations.hash_key, reservations.range_key,
+                                      reservations.indexes, reservations.items)
+        self.dynamodb = LocalDynamoDBResource(reservations, calendar_table(), sessions_table())
+        aws_clients.set_client('dynamodb', self.dynamodb)
+        aws_clients.set_client('bedrock-runtime',
+                               FakeBedrockRuntime(scripted_model(lambda_function.EQUIPMENT_CATALOG)))
+
+        self.lambda_client = LocalLambdaClient(lambda_function.lambda_handler)
+        self.lex_client = LocalLexRuntime(is_rental_message)
+        self.connect_client = LocalConnectClient([tester.lex_bot_alias_arn])
+
+
+BACKENDS = {backend.name: backend for backend in (AwsBackend, LocalBackend)}
+
+
+class RentalSystemTester:
+    def __init__(self, backend='aws', workers=8):
+        self.backend_name = backend
+        self.workers = workers
+        self.backend = None
+        self.lambda_client = None
+        self.lex_client = None
+        self.connect_client = None
+        self.dynamodb = None
+
         # Configuration (will be loaded from Terraform outputs)
         self.lambda_function_name = None
         self.lex_bot_id = None
         self.lex_bot_alias_id = None
+        self.lex_bot_alias_arn = None
         self.connect_instance_id = None
         self.dynamodb_table_name = None
 
+        self.results = []
         self.test_results = []
+        self.duration_ms = 0.0
 
     def load_terraform_outputs(self):
         """Load configuration from terraform outputs"""
@@ -62,7 +155,12 @@ class RentalSystemTester:
             self.lex_bot_alias_id = os.environ.get('LEX_BOT_ALIAS_ID', 'TSTALIASID')
             self.connect_instance_id = os.environ.get('CONNECT_INSTANCE_ID', 'd855fff2-cb06-43ee-9af1-006878805bec')
             self.dynamodb_table_name = os.environ.get('DYNAMODB_TABLE_NAME', 'hauliday_reservations')
+            self.lex_bot_alias_arn = os.environ.get(
+                'LEX_BOT_ALIAS_ARN',
+                f"arn:aws:lex:us-west-2:891377073036:bot-alias/{self.lex_bot_id}/{self.lex_bot_alias_id}"
+            )
 
+            print_info(f"Backend: {self.backend_name}")
             print_info(f"Lambda Function: {self.lambda_function_name}")
             print_info(f"Lex Bot ID: {self.lex_bot_id}")
             print_info(f"Connect Instance: {self.connect_instance_id}")
@@ -73,53 +171,50 @@ class RentalSystemTester:
             return False
         return True
 
-    def test_lambda_function(self):
-        """Test Lambda function with various scenarios"""
-        print_header("Testing Lambda Function")
+    def connect_backend(self):
+        """Create the clients for the selected backend"""
+        try:
+            self.backend = BACKENDS[self.backend_name](self)
+        except Exception as e:
+            print_error(f"Failed to set up the {self.backend_name} backend: {str(e)}")
+            return False
+        self.lambda_client = self.backend.lambda_client
+        self.lex_client = self.backend.lex_client
+        self.connect_client = self.backend.connect_client
+        self.dynamodb = self.backend.dynamodb
+        return True
 
+    def invoke_lambda(self, payload):
+        """Invoke the rental Lambda and return (status code, decoded result)"""
+        response = self.lambda_client.invoke(
+            FunctionName=self.lambda_function_name,
+            Payload=json.dumps(payload)
+        )
+        return response['StatusCode'], json.loads(response['Payload'].read())
+
+    def lambda_function_cases(self):
+        """Lambda function cases with various scenarios"""
+        # A fixed calendar date goes stale once it passes; ask about one a month out instead
+        check_day = datetime.now().date() + timedelta(days=30)
         test_cases = [
             {
                 "name": "Equipment Catalog Query",
-                "payload": {
-                    "inputTranscript": "What equipment do you have available?",
-                    "sessionState": {
-                        "intent": {"name": "RentalQueryIntent", "slots": {}},
-                        "sessionAttributes": {}
-                    }
-                },
+                "payload": lex_payload("What equipment do you have available?"),
                 "expected_keywords": ["cotton candy", "cargo carrier", "$40", "$30"]
             },
             {
                 "name": "Pricing Query",
-                "payload": {
-                    "inputTranscript": "How much does the cotton candy machine cost?",
-                    "sessionState": {
-                        "intent": {"name": "RentalQueryIntent", "slots": {}},
-                        "sessionAttributes": {}
-                    }
-                },
+                "payload": lex_payload("How much does the cotton candy machine cost?"),
                 "expected_keywords": ["$40", "cotton candy"]
             },
             {
                 "name": "Availability Check",
-                "payload": {
-                    "inputTranscript": "Is the cotton candy machine available August 30th?",
-                    "sessionState": {
-                        "intent": {"name": "RentalQueryIntent", "slots": {}},
-                        "sessionAttributes": {}
-                    }
-                },
-                "expected_keywords": ["cotton candy", "august", "available"]
+                "payload": lex_payload(f"Is the cotton candy machine available {check_day:%B} {check_day.day}, {check_day.year}?"),
+                "expected_keywords": ["cotton candy", f"{check_day:%B}".lower(), "available"]
             },
             {
                 "name": "Invalid Query Handling",
-                "payload": {
-                    "inputTranscript": "Tell me about your company history",
-                    "sessionState": {
-                        "intent": {"name": "RentalQueryIntent", "slots": {}},
-                        "sessionAttributes": {}
-                    }
-                },
+                "payload": lex_payload("Tell me about your company history"),
                 "expected_keywords": ["equipment rental", "help"]
             },
             {
@@ -129,48 +224,27 @@ class RentalSystemTester:
             }
         ]
 
-        for test_case in test_cases:
-            try:
-                print(f"\n{Colors.PURPLE}🧪 Testing: {test_case['name']}{Colors.NC}")
-
-                response = self.lambda_client.invoke(
-                    FunctionName=self.lambda_function_name,
-                    Payload=json.dumps(test_case['payload'])
-                )
-
-                result = json.loads(response['Payload'].read())
-
-                if response['StatusCode'] == 200:
-                    print_success(f"Lambda invocation successful")
-
-                    # Check response structure
-                    if 'messages' in result and len(result['messages']) > 0:
-                        response_text = result['messages'][0]['content'].lower()
-                        print_info(f"Response: {result['messages'][0]['content'][:100]}...")
-
-                        # Check for expected keywords
-                        keywords_found = [kw for kw in test_case['expected_keywords'] if kw.lower() in response_text]
-                        if keywords_found:
-                            print_success(f"Found expected keywords: {keywords_found}")
-                            self.test_results.append(f"✅ Lambda Test - {test_case['name']}")
-                        else:
-                            print_warning(f"Expected keywords not found: {test_case['expected_keywords']}")
-                            self.test_results.append(f"⚠️  Lambda Test - {test_case['name']} (partial)")
-                    else:
-                        print_error("No messages in response")
-                        self.test_results.append(f"❌ Lambda Test - {test_case['name']}")
-                else:
-                    print_error(f"Lambda invocation failed with status {response['StatusCode']}")
-                    self.test_results.append(f"❌ Lambda Test - {test_case['name']}")
-
-            except Exception as e:
-                print_error(f"Test failed: {str(e)}")
-                self.test_results.append(f"❌ Lambda Test - {test_case['name']}")
-
-    def test_lex_bot(self):
-        """Test Lex bot intent recognition"""
-        print_header("Testing Lex Bot")
-
+        def case(test_case):
+            def run():
+                status_code, result = self.invoke_lambda(test_case['payload'])
+                if status_code != 200:
+                    return FAILED, f"Lambda invocation failed with status {status_code}", []
+                if not result.get('messages'):
+                    return FAILED, "No messages in response", []
+
+                content = result['messages'][0]['content']
+                details = [f"Response: {content[:100]}..."]
+                # Check for expected keywords
+                keywords_found = [kw for kw in test_case['expected_keywords'] if kw.lower() in content.lower()]
+                if keywords_found:
+                    return PASSED, f"Found expected keywords: {keywords_found}", details
+                return WARNING, f"Expected keywords not found: {test_case['expected_keywords']}", details
+            return Case('Lambda', test_case['name'], run)
+
+        return [case(test_case) for test_case in test_cases]
+
+    def lex_bot_cases(self):
+        """Lex bot intent recognition cases"""
         test_utterances = [
             "What equipment do you have?",
             "How much does the cotton candy machine cost?",
@@ -179,10 +253,8 @@ class RentalSystemTester:
             "Show me your prices"
         ]
 
-        for utterance in test_utterances:
-            try:
-                print(f"\n{Colors.PURPLE}🧪 Testing utterance: '{utterance}'{Colors.NC}")
-
+        def case(utterance):
+            def run():
                 response = self.lex_client.recognize_text(
                     botId=self.lex_bot_id,
                     botAliasId=self.lex_bot_alias_id,
@@ -193,48 +265,35 @@ class RentalSystemTester:
 
                 intent_name = response['sessionState']['intent']['name']
                 confidence = response['interpretations'][0]['nluConfidence']['score']
-
+                message = f"Recognized as {intent_name} with confidence {confidence:.2f}"
                 if intent_name == 'RentalQueryIntent' and confidence > 0.7:
-                    print_success(f"Recognized as {intent_name} with confidence {confidence:.2f}")
-                    self.test_results.append(f"✅ Lex Test - '{utterance[:30]}...'")
-                else:
-                    print_warning(f"Recognized as {intent_name} with confidence {confidence:.2f}")
-                    self.test_results.append(f"⚠️  Lex Test - '{utterance[:30]}...'")
-
-            except Exception as e:
-                print_error(f"Lex test failed: {str(e)}")
-                self.test_results.append(f"❌ Lex Test - '{utterance[:30]}...'")
+                    return PASSED, message, []
+                return WARNING, message, []
+            return Case('Lex', f"'{utterance[:30]}...'", run)
 
-    def test_dynamodb_integration(self):
-        """Test DynamoDB table access"""
-        print_header("Testing DynamoDB Integration")
+        return [case(utterance) for utterance in test_utterances]
 
-        try:
+    def dynamodb_cases(self):
+        """DynamoDB table access case"""
+        def run():
             table = self.dynamodb.Table(self.dynamodb_table_name)
 
             # Test table scan
             response = table.scan(Limit=5)
             item_count = response['Count']
 
-            print_success(f"Successfully connected to DynamoDB table")
-            print_info(f"Found {item_count} reservation records")
-
+            details = [f"Found {item_count} reservation records"]
             if item_count > 0:
                 # Show sample reservation
                 sample_item = response['Items'][0]
-                print_info(f"Sample reservation: {sample_item.get('equipment_id', 'N/A')} for {sample_item.get('start_date', 'N/A')}")
+                details.append(f"Sample reservation: {sample_item.get('equipment_id', 'N/A')} for {sample_item.get('start_date', 'N/A')}")
+            return PASSED, "Successfully connected to DynamoDB table", details
 
-            self.test_results.append("✅ DynamoDB Integration")
+        return [Case('DynamoDB', 'Integration', run)]
 
-        except Exception as e:
-            print_error(f"DynamoDB test failed: {str(e)}")
-            self.test_results.append("❌ DynamoDB Integration")
-
-    def test_connect_integration(self):
-        """Test Amazon Connect integration"""
-        print_header("Testing Amazon Connect Integration")
-
-        try:
+    def connect_cases(self):
+        """Amazon Connect integration case"""
+        def run():
             # Check if Lex bot is associated with Connect
             response = self.connect_client.list_bots(
                 InstanceId=self.connect_instance_id,
@@ -247,32 +306,20 @@ class RentalSystemTester:
                 if 'LexV2Bot' in bot and 'AliasArn' in bot['LexV2Bot']:
                     associated_bot_arns.append(bot['LexV2Bot']['AliasArn'])
 
-            # Construct expected ARN
-            expected_arn = f"arn:aws:lex:us-west-2:891377073036:bot-alias/{self.lex_bot_id}/{self.lex_bot_alias_id}"
+            if self.lex_bot_alias_arn in associated_bot_arns:
+                return PASSED, "Lex bot is associated with Connect instance", [f"Bot ARN: {self.lex_bot_alias_arn}"]
+            return (WARNING, "Lex bot is not associated with Connect instance (needs setup)",
+                    ["Run the association script: ./associate_lex_with_connect.sh"])
 
-            if expected_arn in associated_bot_arns:
-                print_success("Lex bot is associated with Connect instance")
-                print_info(f"Bot ARN: {expected_arn}")
-                self.test_results.append("✅ Connect-Lex Association")
-            else:
-                print_warning("Lex bot is not associated with Connect instance")
-                print_info("Run the association script: ./associate_lex_with_connect.sh")
-                self.test_results.append("⚠️  Connect-Lex Association (needs setup)")
+        return [Case('Connect', 'Lex Association', run)]
 
-        except Exception as e:
-            print_error(f"Connect integration test failed: {str(e)}")
-            self.test_results.append("❌ Connect Integration")
-
-    def test_end_to_end_flow(self):
-        """Test complete end-to-end flow"""
-        print_header("Testing End-to-End Flow")
-
-        try:
+    def end_to_end_cases(self):
+        """Complete end-to-end flow; its steps depend on each other so it is a single case"""
+        def run():
             # Simulate a complete conversation flow
             session_id = f"e2e-test-{datetime.now().timestamp()}"
 
             # Step 1: Ask about equipment
-            print(f"\n{Colors.PURPLE}🧪 Step 1: Equipment inquiry{Colors.NC}")
             lex_response = self.lex_client.recognize_text(
                 botId=self.lex_bot_id,
                 botAliasId=self.lex_bot_alias_id,
@@ -280,79 +327,162 @@ class RentalSystemTester:
                 sessionId=session_id,
                 text="What equipment do you have?"
             )
+            if lex_response['sessionState']['intent']['name'] != 'RentalQueryIntent':
+                return FAILED, "Lex failed to identify rental query intent", []
+            details = ["Step 1: Lex correctly identified rental query intent"]
+
+            # Step 2: Test Lambda with pricing question
+            _, result = self.invoke_lambda(lex_payload("How much does the cotton candy machine cost?"))
+            if 'messages' in result and '$40' in result['messages'][0]['content']:
+                details.append("Step 2: Lambda correctly provided pricing information")
+                return PASSED, "Conversation completed", details
+            return FAILED, "Lambda pricing response incorrect", details
+
+        return [Case('End-to-End', 'Flow', run)]
+
+    def all_cases(self):
+        return (self.lambda_function_cases() + self.lex_bot_cases() + self.dynamodb_cases()
+                + self.connect_cases() + self.end_to_end_cases())
+
+    def run_case(self, case):
+        """Run one case, timing it and turning exceptions into failures"""
+        started_at = time.perf_counter()
+        try:
+            status, message, details = case.run()
+        except Exception as e:
+            status, message, details = FAILED, f"Test failed: {str(e)}", traceback.format_exc().splitlines()[-3:]
+        duration_ms = round((time.perf_counter() - started_at) * 1000, 1)
+        return CaseResult(case.suite, case.name, status, message, details, duration_ms)
+
+    def run_cases(self, cases):
+        """Run cases concurrently and print their results in declaration order"""
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            results = list(executor.map(self.run_case, cases))
+
+        suite = None
+        for result in results:
+            if result.suite != suite:
+                suite = result.suite
+                print_header(f"Testing {suite}")
+            print(f"\n{Colors.PURPLE}🧪 {result.name} ({result.duration_ms:.0f} ms){Colors.NC}")
+            _STATUS_PRINTERS[result.status](result.message)
+            for detail in result.details:
+                print_info(detail)
+
+        self.results.extend(results)
+        self.test_results.extend(f"{_STATUS_SYMBOLS[result.status]} {result.suite} Test - {result.name}"
+                                 for result in results)
+        return results
 
-            if lex_response['sessionState']['intent']['name'] == 'RentalQueryIntent':
-                print_success("Lex correctly identified rental query intent")
-
-                # Step 2: Test Lambda with pricing question
-                print(f"\n{Colors.PURPLE}🧪 Step 2: Pricing inquiry{Colors.NC}")
-                lambda_response = self.lambda_client.invoke(
-                    FunctionName=self.lambda_function_name,
-                    Payload=json.dumps({
-                        "inputTranscript": "How much does the cotton candy machine cost?",
-                        "sessionState": {
-                            "intent": {"name": "RentalQueryIntent", "slots": {}},
-                            "sessionAttributes": {}
-                        }
-                    })
-                )
+    def test_lambda_function(self):
+        """Test Lambda function with various scenarios"""
+        return self.run_cases(self.lambda_function_cases())
+
+    def test_lex_bot(self):
+        """Test Lex bot intent recognition"""
+        return self.run_cases(self.lex_bot_cases())
 
-                result = json.loads(lambda_response['Payload'].read())
-                if 'messages' in result and '$40' in result['messages'][0]['content']:
-                    print_success("Lambda correctly provided pricing information")
-                    self.test_results.append("✅ End-to-End Flow")
-                else:
-                    print_error("Lambda pricing response incorrect")
-                    self.test_results.append("❌ End-to-End Flow")
-            else:
-                print_error("Lex failed to identify rental query intent")
-                self.test_results.append("❌ End-to-End Flow")
+    def test_dynamodb_integration(self):
+        """Test DynamoDB table access"""
+        return self.run_cases(self.dynamodb_cases())
 
-        except Exception as e:
-            print_error(f"End-to-end test failed: {str(e)}")
-            self.test_results.append("❌ End-to-End Flow")
+    def test_connect_integration(self):
+        """Test Amazon Connect integration"""
+        return self.run_cases(self.connect_cases())
+
+    def test_end_to_end_flow(self):
+        """Test complete end-to-end flow"""
+        return self.run_cases(self.end_to_end_cases())
+
+    def counts(self):
+        return {status: len([r for r in self.results if r.status == status]) for status in (PASSED, WARNING, FAILED)}
 
     def print_summary(self):
         """Print test summary"""
         print_header("Test Summary")
 
-        passed = len([r for r in self.test_results if r.startswith('✅')])
-        warnings = len([r for r in self.test_results if r.startswith('⚠️')])
-        failed = len([r for r in self.test_results if r.startswith('❌')])
+        counts = self.counts()
+        passed, warnings, failed = counts[PASSED], counts[WARNING], counts[FAILED]
         total = len(self.test_results)
 
         print(f"\n{Colors.GREEN}Passed: {passed}{Colors.NC}")
         print(f"{Colors.YELLOW}Warnings: {warnings}{Colors.NC}")
         print(f"{Colors.RED}Failed: {failed}{Colors.NC}")
-        print(f"Total: {total}")
+        print(f"Total: {total} in {self.duration_ms / 1000:.1f}s ({self.workers} workers)")
 
         print("\nDetailed Results:")
         for result in self.test_results:
             print(f"  {result}")
 
-        if failed == 0:
+        if failed == 0 and warnings == 0:
             print(f"\n{Colors.GREEN}🎉 All critical tests passed! System is ready for use.{Colors.NC}")
-        elif warnings > 0 and failed == 0:
+        elif failed == 0:
             print(f"\n{Colors.YELLOW}⚠️  System is functional but needs some manual setup.{Colors.NC}")
         else:
             print(f"\n{Colors.RED}❌ Some tests failed. Please review and fix issues.{Colors.NC}")
 
+    def write_json(self, path):
+        """Write every case result and the totals as JSON"""
+        report = {
+            'timestamp': datetime.now().isoformat(),
+            'backend': self.backend_name,
+            'duration_ms': self.duration_ms,
+            'summary': {**self.counts(), 'total': len(self.results)},
+            'cases': [result._asdict() for result in self.results],
+        }
+        with open(path, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+    def write_junit(self, path):
+        """Write JUnit XML with one testsuite per suite; warnings pass but keep their message in system-out"""
+        testsuites = ET.Element('testsuites', name='RentalSystemTester', tests=str(len(self.results)),
+                                failures=str(self.counts()[FAILED]), time=f"{self.duration_ms / 1000:.3f}")
+        suites = {}
+        for result in self.results:
+            testsuite = suites.get(result.suite)
+            if testsuite is None:
+                testsuite = suites[result.suite] = ET.SubElement(testsuites, 'testsuite', name=result.suite)
+            testcase = ET.SubElement(testsuite, 'testcase', classname=f"{self.backend_name}.{result.suite}",
+                                     name=result.name, time=f"{result.duration_ms / 1000:.3f}")
+            if result.status == FAILED:
+                ET.SubElement(testcase, 'failure', message=result.message).text = '\n'.join(result.details)
+            output = [f"WARNING: {result.message}"] if result.status == WARNING else [result.message]
+            ET.SubElement(testcase, 'system-out').text = '\n'.join(output + result.details)
+        for testsuite in suites.values():
+            cases = [r for r in self.results if r.suite == testsuite.get('name')]
+            testsuite.set('tests', str(len(cases)))
+            testsuite.set('failures', str(len([r for r in cases if r.status == FAILED])))
+            testsuite.set('time', f"{sum(r.duration_ms for r in cases) / 1000:.3f}")
+        ET.ElementTree(testsuites).write(path, encoding='utf-8', xml_declaration=True)
+
     def run_all_tests(self):
-        """Run all test suites"""
+        """Run every case concurrently; returns False if any failed"""
         print(f"{Colors.BLUE}🧪 Starting Rental System Test Suite{Colors.NC}")
         print(f"{Colors.BLUE}Timestamp: {datetime.now().isoformat()}{Colors.NC}")
 
-        if not self.load_terraform_outputs():
-            return
+        if not self.load_terraform_outputs() or not self.connect_backend():
+            return False
 
-        self.test_lambda_function()
-        self.test_lex_bot()
-        self.test_dynamodb_integration()
-        self.test_connect_integration()
-        self.test_end_to_end_flow()
+        started_at = time.perf_counter()
+        self.run_cases(self.all_cases())
+        self.duration_ms = round((time.perf_counter() - started_at) * 1000, 1)
 
         self.print_summary()
+        return self.counts()[FAILED] == 0
 
 if __name__ == "__main__":
-    tester = RentalSystemTester()
-    tester.run_all_tests()
+    parser = argparse.ArgumentParser(description="Rental system test suite")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=os.environ.get('TEST_BACKEND', 'aws'),
+                        help="'aws' for the deployed system, 'local' for in-process fakes")
+    parser.add_argument('--workers', type=int, default=8, help='cases run concurrently')
+    parser.add_argument('--json', metavar='PATH', help='write results as JSON')
+    parser.add_argument('--junit', metavar='PATH', help='write results as JUnit XML')
+    args = parser.parse_args()
+
+    tester = RentalSystemTester(backend=args.backend, workers=args.workers)
+    ok = tester.run_all_tests()
+    if args.json:
+        tester.write_json(args.json)
+    if args.junit:
+        tester.write_junit(args.junit)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,168 @@
+"""
+Token and cost accounting for model calls, with a per-call token budget.
+
+Every Bedrock reply's usage block is added to the current turn. At the end of
+the turn the totals are added to the call's running totals, which travel in
+the Lex session attributes (or the Connect session item) as compact JSON, and
+each model call's tokens and cost are emitted as metrics.
+
+The call's remaining budget decides how the next turn is generated: the full
+max_tokens while more than half is left, a proportionally shorter max_tokens
+below that, the fast model for turns that do not need a lookup below a fifth,
+and no model call at all once the budget is spent. Hedged duplicates and
+timed-out calls that still completed are counted too, since they are billed.
+
+Prompt-cache reads and writes are priced at their own multiples of the input
+rate, and count towards the budget at the same weight, so a cached system
+prompt costs a tenth of an uncached one.
+"""
+
+import json
+import threading
+from collections import namedtuple
+
+TOKEN_USAGE_ATTRIBUTE = 'token_usage'
+
+# On-demand USD per 1,000 (input, output) tokens, matched by model ID substring
+MODEL_PRICES_PER_1K = {
+    'claude-3-haiku': (0.00025, 0.00125),
+    'claude-3-5-haiku': (0.0008, 0.004),
+    'claude-3-sonnet': (0.003, 0.015),
+    'claude-3-5-sonnet': (0.003, 0.015),
+    'claude-3-7-sonnet': (0.003, 0.015),
+    'claude-3-opus': (0.015, 0.075),
+}
+DEFAULT_PRICE_PER_1K = (0.003, 0.015)
+# Prompt-cache reads and writes are billed at these multiples of the model's input price
+CACHE_READ_PRICE_FACTOR = 0.1
+CACHE_WRITE_PRICE_FACTOR = 1.25
+
+BudgetPlan = namedtuple('BudgetPlan', ['max_tokens', 'prefer_fast', 'exhausted'])
+
+
+def model_price(model_id):
+    """(input, output) USD per 1,000 tokens for a model ID, the longest matching name winning"""
+    for name in sorted(MODEL_PRICES_PER_1K, key=len, reverse=True):
+        if name in (model_id or ''):
+            return MODEL_PRICES_PER_1K[name]
+    return DEFAULT_PRICE_PER_1K
+
+
+class TokenUsage:
+    """
+    Input and output tokens, model calls and cost, for one turn or a whole call.
+
+    input_tokens counts every input token; cache_read_tokens and
+    cache_write_tokens are the parts of it read from or written to the prompt cache.
+    """
+
+    def __init__(self, input_tokens=0, output_tokens=0, model_calls=0, cost_usd=0.0,
+                 cache_read_tokens=0, cache_write_tokens=0):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.model_calls = model_calls
+        self.cost_usd = cost_usd
+        self.cache_read_tokens = cache_read_tokens
+        self.cache_write_tokens = cache_write_tokens
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self):
+        """Tokens counted against the budget, cached input weighted by its price"""
+        uncached = self.input_tokens - self.cache_read_tokens - self.cache_write_tokens
+        return round(uncached + self.cache_read_tokens * CACHE_READ_PRICE_FACTOR
+                     + self.cache_write_tokens * CACHE_WRITE_PRICE_FACTOR) + self.output_tokens
+
+    def add(self, model_id, usage):
+        """Add one reply's usage block; returns (input tokens, output tokens, cost) for that reply"""
+        uncached = int(usage.get('input_tokens', 0))
+        cache_read = int(usage.get('cache_read_input_tokens', 0))
+        cache_write = int(usage.get('cache_creation_input_tokens', 0))
+        output_tokens = int(usage.get('output_tokens', 0))
+        input_price, output_price = model_price(model_id)
+        cost = (uncached * input_price + cache_read * input_price * CACHE_READ_PRICE_FACTOR
+                + cache_write * input_price * CACHE_WRITE_PRICE_FACTOR + output_tokens * output_price) / 1000
+        input_tokens = uncached + cache_read + cache_write
+        with self._lock:
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.cache_read_tokens += cache_read
+            self.cache_write_tokens += cache_write
+            self.model_calls += 1
+            self.cost_usd += cost
+        return input_tokens, output_tokens, cost
+
+    def merged(self, other):
+        return TokenUsage(self.input_tokens + other.input_tokens, self.output_tokens + other.output_tokens,
+                          self.model_calls + other.model_calls, self.cost_usd + other.cost_usd,
+                          self.cache_read_tokens + other.cache_read_tokens,
+                          self.cache_write_tokens + other.cache_write_tokens)
+
+    def as_dict(self):
+        return {
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'cache_read_tokens': self.cache_read_tokens,
+            'cache_write_tokens': self.cache_write_tokens,
+            'model_calls': self.model_calls,
+            'cost_usd': round(self.cost_usd, 6),
+        }
+
+    def to_attribute(self):
+        return json.dumps(self.as_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_attribute(cls, text):
+        """Parse a stored attribute; missing or malformed values start from zero"""
+        try:
+            data = json.loads(text or '{}')
+            return cls(int(data.get('input_tokens', 0)), int(data.get('output_tokens', 0)),
+                       int(data.get('model_calls', 0)), float(data.get('cost_usd', 0.0)),
+                       int(data.get('cache_read_tokens', 0)), int(data.get('cache_write_tokens', 0)))
+        except (TypeError, ValueError, AttributeError):
+            return cls()
+
+
+class TokenBudget:
+    """Maps the tokens a call has used so far to how its next turn may use the model"""
+
+    def __init__(self, call_budget, max_tokens=1000, min_max_tokens=150, shrink_below=0.5, fast_below=0.2):
+        self.call_budget = call_budget
+        self.max_tokens = max_tokens
+        self.min_max_tokens = min_max_tokens
+        self.shrink_below = shrink_below
+        self.fast_below = fast_below
+
+    def plan(self, used_tokens):
+        """Return the BudgetPlan for a call that has used used_tokens (a budget of 0 means unlimited)"""
+        if self.call_budget <= 0:
+            return BudgetPlan(self.max_tokens, False, False)
+        remaining = self.call_budget - used_tokens
+        if remaining <= 0:
+            return BudgetPlan(0, True, True)
+        fraction = remaining / self.call_budget
+        max_tokens = self.max_tokens
+        if fraction < self.shrink_below:
+            max_tokens = max(self.min_max_tokens, int(self.max_tokens * fraction / self.shrink_below))
+        return BudgetPlan(min(max_tokens, remaining), fraction < self.fast_below, False)
+
+
+class TokenAccountant:
+    """Usage for the current turn and the call it belongs to, and the budget plan for the turn"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.start_turn()
+
+    def start_turn(self, call_usage=None):
+        """Begin a turn of a call that has already used call_usage (a new call if None)"""
+        self.call = call_usage or TokenUsage()
+        self.turn = TokenUsage()
+        self.plan = self.budget.plan(self.call.total_tokens)
+
+    def record(self, model_id, usage):
+        return self.turn.add(model_id, usage or {})
+
+    def call_totals(self):
+        """The call's usage including this turn"""
+        return self.call.merged(self.turn)
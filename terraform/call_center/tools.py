@@ -0,0 +1,129 @@
+"""
+Tool registry and dispatcher for Bedrock Messages API tool use.
+
+Handlers are registered with a small JSON-schema subset (string, integer,
+boolean, array, enum, and an ISO ``date`` format). Arguments are validated
+before a handler runs, and validation failures go back to the model as
+``is_error`` tool results so it can correct itself without another caller turn.
+"""
+
+import contextlib
+import json
+import re
+from datetime import date
+
+_TYPES = {
+    'string': str,
+    'integer': int,
+    'boolean': bool,
+    'array': list,
+}
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+class ToolValidationError(ValueError):
+    """Raised when a tool call has missing or malformed arguments"""
+
+
+class ToolRegistry:
+    """Registry of tool handlers and their Messages API schemas"""
+
+    def __init__(self):
+        self._tools = {}
+
+    def register(self, name, description, properties, required=()):
+        """Decorator registering a handler called with the validated arguments as keywords"""
+        def decorator(handler):
+            self._tools[name] = {
+                'handler': handler,
+                'spec': {
+                    'name': name,
+                    'description': description,
+                    'input_schema': {
+                        'type': 'object',
+                        'properties': properties,
+                        'required': list(required)
+                    }
+                }
+            }
+            return handler
+        return decorator
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def specs(self):
+        """Return tool definitions for the Messages API ``tools`` field"""
+        return [tool['spec'] for tool in self._tools.values()]
+
+    def validate(self, name, arguments):
+        """Check arguments against the registered schema and return the cleaned values"""
+        if name not in self._tools:
+            raise ToolValidationError(f'Unknown tool: {name}')
+        if not isinstance(arguments, dict):
+            raise ToolValidationError('Tool input must be an object')
+
+        schema = self._tools[name]['spec']['input_schema']
+        missing = [field for field in schema['required'] if arguments.get(field) in (None, '')]
+        if missing:
+            raise ToolValidationError(f"Missing required argument(s): {', '.join(missing)}")
+
+        cleaned = {}
+        for field, value in arguments.items():
+            rules = schema['properties'].get(field)
+            if rules is None:
+                continue  # Ignore arguments the tool does not declare
+            cleaned[field] = _validate_value(field, value, rules)
+        return cleaned
+
+    def call(self, name, arguments):
+        """Validate and run one tool, returning (content, is_error)"""
+        try:
+            result = self._tools[name]['handler'](**self.validate(name, arguments))
+        except ToolValidationError as error:
+            return f'Invalid arguments: {error}', True
+        except Exception as error:
+            return f'{name} failed: {error}', True
+        return (result if isinstance(result, str) else json.dumps(result)), False
+
+    def dispatch(self, tool_uses, executor=None, span=None):
+        """
+        Run tool_use blocks (concurrently when an executor is given) and return tool_result blocks.
+
+        span, if given, is called with the tool name and must return a context
+        manager wrapped around that tool's execution (used for timing).
+        """
+        def run(tool_use):
+            with span(tool_use['name']) if span else contextlib.nullcontext():
+                content, is_error = self.call(tool_use['name'], tool_use.get('input', {}))
+            result = {'type': 'tool_result', 'tool_use_id': tool_use['id'], 'content': content}
+            if is_error:
+                result['is_error'] = True
+            return result
+
+        if executor and len(tool_uses) > 1:
+            return list(executor.map(run, tool_uses))
+        return [run(tool_use) for tool_use in tool_uses]
+
+
+def _validate_value(field, value, rules):
+    expected = rules.get('type', 'string')
+    python_type = _TYPES[expected]
+    if expected == 'integer' and isinstance(value, bool) or not isinstance(value, python_type):
+        raise ToolValidationError(f'{field} must be of type {expected}')
+
+    if expected == 'string':
+        value = value.strip()
+    if 'enum' in rules and value not in rules['enum']:
+        raise ToolValidationError(f"{field} must be one of: {', '.join(rules['enum'])}")
+    if rules.get('format') == 'date':
+        if not _ISO_DATE.match(value):
+            raise ToolValidationError(f'{field} must be a date in YYYY-MM-DD format')
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            raise ToolValidationError(f'{field} is not a valid calendar date')
+    if expected == 'array' and 'items' in rules:
+        value = [_validate_value(field, item, rules['items']) for item in value]
+    return value
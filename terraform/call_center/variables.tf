@@ -22,6 +22,18 @@ variable "bedrock_model_id" {
   default     = "anthropic.claude-3-sonnet-20240229-v1:0"
 }
 
+variable "bedrock_fast_model_id" {
+  description = "Bedrock model ID for simple turns (greetings, goodbyes, price questions); empty disables routing"
+  type        = string
+  default     = "anthropic.claude-3-haiku-20240307-v1:0"
+}
+
+variable "model_route_overrides" {
+  description = "Per-route model overrides, e.g. \"greeting=<model id>,large=<model id>\""
+  type        = string
+  default     = ""
+}
+
 
 
 variable "claim_phone_number" {
@@ -59,6 +59,24 @@ resource "aws_dynamodb_table" "hauliday_reservations" {
   }
 }
 
+# One item per equipment: per-day reservation counts maintained from the
+# hauliday_reservations stream (see call_center/reservation_calendar.py)
+resource "aws_dynamodb_table" "hauliday_equipment_calendar" {
+  name         = "hauliday_equipment_calendar"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "equipment_id"
+
+  attribute {
+    name = "equipment_id"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "Hauliday Equipment Calendar"
+    Environment = "production"
+    Service     = "hauliday"
+  }
+}
 
 resource "aws_dynamodb_table" "treasure_users" {
   name         = "treasure_users"